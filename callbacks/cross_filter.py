@@ -0,0 +1,50 @@
+import dash
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+from app import app
+from datastore.dataset import filtered_df, apply_selection, window_mask, pathname_viewpoint
+from datastore.filter_cache import filter_key
+from datastore.figure_cache import cached_figure
+from datastore.spatial_index import selection_geometry
+from layouts.layout_perviewpoint import pupil_figure
+
+
+# Box/lasso selection on the gaze or fixation plot (per viewpoint page) -> Store 'gaze-selection'
+# The other tabs are rendered again with the selected samples (callbacks/render_tabs.py)
+@app.callback(
+    Output('gaze-selection', 'data'),
+    [Input('aoi-gaze-graph', 'selectedData'),
+     Input('fixation-graph', 'selectedData')],
+    [State('gaze-selection', 'data')]
+)
+def select_gaze(gaze, fixations, current):
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    graph = 'fixations' if 'fixation-graph.selectedData' in triggered else 'gaze'
+    geometry = selection_geometry(fixations if graph == 'fixations' else gaze)
+    selection = dict(geometry, graph=graph) if geometry else None
+    if selection == current:
+        raise PreventUpdate
+    return selection
+
+
+# Pupil plot of the Eyes tab for the selected samples (all samples when the selection is cleared)
+@app.callback(
+    Output('pupil-graph', 'figure'),
+    [Input('gaze-selection', 'data')],
+    [State('url', 'pathname'),
+     State('data-storage', 'data'),
+     State('time-window', 'data')]
+)
+def select_pupil(selection, pathname, data, window):
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    vp = pathname_viewpoint(pathname)
+    if 'gaze-selection.data' not in triggered or vp is None or data is None:
+        raise PreventUpdate
+
+    dff = filtered_df(data, vp)
+    if not selection and not window:
+        return cached_figure('perviewpoint/pupilscat', filter_key(data, vp), lambda: pupil_figure(dff))
+    if window:
+        dff = dff[window_mask(data, window)[dff.index.to_numpy()]]
+    return pupil_figure(apply_selection(dff, vp, selection))
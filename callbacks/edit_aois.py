@@ -0,0 +1,48 @@
+import re
+
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+from app import app
+from datastore.dataset import filtered_df, filtered_fixations, pathname_viewpoint
+from datastore.aoi import AoiIndex, aoi_stats, path_polygon
+from layouts.layout_perviewpoint import aoi_table
+
+SHAPE_PATH = re.compile(r'shapes\[(\d+)\]\.path')
+
+
+# relayoutData -> {shape number: new SVG path} of the edited shapes
+def shape_edits(relayout):
+    edits = {}
+    for key, value in (relayout or {}).items():
+        match = SHAPE_PATH.fullmatch(key)
+        if match:
+            edits[int(match.group(1))] = value
+    return edits
+
+
+# Editing an area of interest on the gaze plot (per viewpoint page) recomputes
+# its stats for the selected respondents
+@app.callback(
+    [Output('aoi-table', 'children'),
+     Output('aoi-polygons', 'data')],
+    [Input('aoi-gaze-graph', 'relayoutData')],
+    [State('aoi-polygons', 'data'),
+     State('url', 'pathname'),
+     State('data-storage', 'data')]
+)
+def edit_aois(relayout, aois, pathname, data):
+    edits = shape_edits(relayout)
+    vp = pathname_viewpoint(pathname)
+    if not edits or not aois or vp is None or data is None:
+        raise PreventUpdate
+
+    for number, path in edits.items():
+        if number < len(aois['polygons']):
+            aois['polygons'][number] = path_polygon(path).tolist()
+    polygons = dict(zip(aois['names'], aois['polygons']))
+
+    # All samples of the respondents, like the precomputed stats (also when invalid samples are excluded)
+    samples = filtered_df(dict(data, exclude_invalid=False), vp)
+    stats = aoi_stats(samples, filtered_fixations(data, vp), AoiIndex(polygons))
+    return aoi_table(stats), aois
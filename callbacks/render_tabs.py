@@ -0,0 +1,74 @@
+import dash
+import dash_html_components as html
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+from app import app
+from datastore.dataset import (filtered_df, filtered_fixations, filtered_metrics, filtered_scorecard,
+                               filtered_aoi_stats, apply_selection, apply_window, pathname_viewpoint)
+from datastore.filter_cache import filter_key
+import layouts.layout_fullroute as fullroute
+import layouts.layout_perviewpoint as perviewpoint
+
+TABS = ['tab-eyetracker', 'tab-gsr', 'tab-movement', 'tab-quality']
+
+# Render only the chosen tab (full route & per viewpoint pages)
+# Tabs that were rendered before keep their content in the page, so switching
+# back to them doesn't need the server. A new page (other filters) starts empty.
+# A box/lasso selection on the viewpoint's gaze/fixation plot (Store 'gaze-selection') empties
+# the other tabs, they are rendered again with only the selected samples.
+# A brushed time window (Store 'time-window') empties all tabs and renders the active one again.
+@app.callback(
+    [Output(f'{tab}-content', 'children') for tab in TABS] +
+    [Output('tabs-rendered', 'data')],
+    [Input('tabs-nav', 'value'),
+     Input('gaze-selection', 'data'),
+     Input('time-window', 'data')],
+    [State('url', 'pathname'),
+     State('data-storage', 'data'),
+     State('tabs-rendered', 'data')]
+)
+def render_tabs(tab, selection, window, pathname, data, rendered):
+    rendered = rendered or []
+    outputs = [dash.no_update] * len(TABS)
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    emptied = 'gaze-selection.data' in triggered or 'time-window.data' in triggered
+    if 'time-window.data' in triggered:
+        outputs = [[] for t in TABS]
+        rendered = []
+    elif emptied:
+        # the Eyes tab keeps its plots (the pupil plot is updated by callbacks/cross_filter.py)
+        outputs = [dash.no_update if t == 'tab-eyetracker' else [] for t in TABS]
+        rendered = [t for t in rendered if t == 'tab-eyetracker']
+
+    if tab not in TABS or tab in rendered or data is None:
+        if emptied:
+            return outputs + [rendered]
+        raise PreventUpdate
+
+    vp = pathname_viewpoint(pathname)
+    dff = filtered_df(data, vp)     # cached by render_page_content
+    if len(dff) == 0:
+        raise PreventUpdate
+
+    # Figures are cached per filter state + viewpoint (shared by all sessions)
+    filter_hash = filter_key(data, vp)
+    if selection and vp is not None and tab != 'tab-eyetracker':
+        dff = apply_selection(dff, vp, selection)
+        filter_hash = None      # figures of a selection aren't cached
+    fixations = filtered_fixations(data, vp)
+    metrics = filtered_metrics(data, vp)
+    if window:
+        dff, fixations, metrics = apply_window(data, window, dff, fixations, metrics)
+        filter_hash = None
+    scorecard = filtered_scorecard(data, vp)
+    if len(dff) == 0:
+        children = html.P('No samples in the selected area or time window.', className='mt-5')
+    elif vp is None:
+        children = fullroute.render_tab(dff, fixations, metrics, scorecard, tab, filter_hash)
+    else:
+        aoi_stats = filtered_aoi_stats(data, vp)
+        children = perviewpoint.render_tab(dff, fixations, metrics, scorecard, aoi_stats, tab, vp, filter_hash)
+
+    outputs[TABS.index(tab)] = children
+    return outputs + [rendered + [tab]]
@@ -0,0 +1,46 @@
+import json
+
+import dash
+from dash.dependencies import Input, Output, State, ALL
+from dash.exceptions import PreventUpdate
+
+from app import app
+from layouts.time_brush import WINDOW_HINT
+
+
+# selectedData of a time graph -> [t0, t1] of the selected x range (None if it isn't a range)
+def selected_range(selected):
+    if not selected or 'range' not in selected:
+        return None
+    axes = sorted(axis for axis in selected['range'] if axis.startswith('x'))
+    if not axes:
+        return None
+    t0, t1 = selected['range'][axes[0]]
+    return [min(t0, t1), max(t0, t1)]
+
+
+# Brushing a time graph (or clearing the window) -> Store 'time-window'
+# The tabs are rendered again for the window by callbacks/render_tabs.py
+@app.callback(
+    [Output('time-window', 'data'),
+     Output('time-window-info', 'children')],
+    [Input({'type': 'time-graph', 'index': ALL, 'column': ALL, 'zoom': ALL}, 'selectedData'),
+     Input('time-window-clear', 'n_clicks')],
+    [State('time-window', 'data')]
+)
+def brush_time(selections, clear, current):
+    trigger = dash.callback_context.triggered[0]
+    if trigger['prop_id'] == 'time-window-clear.n_clicks':
+        window = None
+    else:
+        t_range = selected_range(trigger['value'])
+        if t_range is None:
+            raise PreventUpdate
+        graph = json.loads(trigger['prop_id'].rsplit('.', 1)[0])
+        window = {'column': graph['column'], 'range': t_range}
+
+    if window == current:
+        raise PreventUpdate
+    if window is None:
+        return None, WINDOW_HINT
+    return window, f"Time window: {window['range'][0]:.1f} - {window['range'][1]:.1f} s ({window['column']})"
@@ -14,9 +14,10 @@ from app import app
      Input('filter-age-slider', 'value'),
      Input('filter-timebegin-input', 'value'),
      Input('filter-timeend-input', 'value'),
+     Input('filter-quality-checklist', 'value'),
      State('data-storage', 'data')]
 )
-def update_filters(gender, age, timebegin, timeend, data):
+def update_filters(gender, age, timebegin, timeend, quality, data):
     data = data or {'test': 'x'}
     # data['respname'] = respname
     data['gender'] = gender                      # list of genders
@@ -24,5 +25,6 @@ def update_filters(gender, age, timebegin, timeend, data):
     data['time'] = [timebegin, timeend]          # list of strings representing time
                                                  # will be processed in index.py
                                                  # because dcc.Store can't hold datetime types
+    data['exclude_invalid'] = 'exclude-invalid' in (quality or [])
 
     return data
\ No newline at end of file
@@ -0,0 +1,47 @@
+from dash.dependencies import Input, Output, State, MATCH
+from dash.exceptions import PreventUpdate
+
+from app import app
+from datastore.dataset import filtered_rows, pyramids
+from layouts.layout_fullroute import zoom_figure
+from layouts.time_brush import brushable
+
+AXES = ['xaxis', 'xaxis2', 'xaxis3']
+
+
+# relayoutData -> {axis: [x0, x1] or None (autorange)}, None if the x axes didn't change
+def zoom_ranges(relayout):
+    if not relayout:
+        return None
+    ranges = {}
+    for axis in AXES:
+        if f'{axis}.range[0]' in relayout:
+            ranges[axis] = [relayout[f'{axis}.range[0]'], relayout[f'{axis}.range[1]']]
+        elif f'{axis}.range' in relayout:
+            ranges[axis] = relayout[f'{axis}.range']
+        elif relayout.get(f'{axis}.autorange'):
+            ranges[axis] = None
+    return ranges or None
+
+
+# Zooming in a time series graph (full route) re-queries the visible range
+# from the pyramids at the matching resolution, for the same respondents, quality filter
+# and time window as the rest of the tab
+# (time graphs with zoom='pyramid', see layouts/time_brush.py)
+ZOOM_GRAPH = {'type': 'time-graph', 'index': MATCH, 'column': 'Timestamp (s)', 'zoom': 'pyramid'}
+
+
+@app.callback(
+    Output(ZOOM_GRAPH, 'figure'),
+    [Input(ZOOM_GRAPH, 'relayoutData')],
+    [State(ZOOM_GRAPH, 'id'),
+     State('data-storage', 'data'),
+     State('time-window', 'data')]
+)
+def zoom_timeseries(relayout, graph_id, data, window):
+    ranges = zoom_ranges(relayout)
+    if ranges is None or data is None:
+        raise PreventUpdate
+
+    names, keep = filtered_rows(data, window)
+    return brushable(zoom_figure(pyramids, graph_id['index'], names, ranges, keep))
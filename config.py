@@ -0,0 +1,102 @@
+# Settings that are shared by the data preparation and the dashboard
+
+# Data
+DATA_CSV = './data/Data_all_respondents.csv'   # iMotions export (all respondents)
+CACHE_DIR = './data/cache'                      # prepared/typed versions of the data
+
+# Storage of the prepared df in CACHE_DIR:
+# 'columns' -> one memory-mapped file per column (datastore/column_store.py): near-instant start,
+#              only the used pages are loaded and they are shared by all server processes
+# 'table'   -> one parquet (or pickle) file, read into the memory of every process
+DATA_STORE = 'columns'
+
+# Storage order of the rows:
+# 'time'       -> sorted by Timestamp (all respondents interleaved)
+# 'respondent' -> grouped by respondent, then by Timestamp. Respondent/viewpoint
+#                 filters become slices of the df (see datastore/row_ranges.py)
+ROW_ORDER = 'time'
+
+# Memory budget of the cache with filtered dfs (per server process)
+FILTER_CACHE_MB = 512
+
+# Cache of built figures: memory (per server process) and disk (shared, survives restarts)
+FIGURE_CACHE_MB = 256
+FIGURE_CACHE_DISK_MB = 2048
+
+# Downsampling of the GSR lines: max. points per respondent/trace and method ('lttb' or 'minmax')
+LINE_POINT_BUDGET = 2000
+DOWNSAMPLE_METHOD = 'lttb'
+
+# Zooming in time series (full route): min/max pyramid with buckets of PYRAMID_FACTOR ** level
+# samples, max. points per respondent/trace for every zoom
+PYRAMID_FACTOR = 4
+ZOOM_POINT_BUDGET = 2000
+
+# Scatter plots with more points than this are rendered with WebGL instead of SVG
+WEBGL_POINT_THRESHOLD = 1000
+
+# Gaze & fixation plots of the viewpoints: 'density' (heatmap binned on the server) or 'scatter' (all points)
+# Density grid: cells of DENSITY_CELL_PX pixels of the panorama, Gaussian smoothing of
+# DENSITY_SIGMA cells (0 = none), fixations weighted by their duration or not
+GAZE_PLOT = 'density'
+DENSITY_CELL_PX = 4
+DENSITY_SIGMA = 2
+DENSITY_DURATION_WEIGHT = True
+
+# Areas of interest (AOIs) of the viewpoints: JSON file {"<viewpoint>": {"<AOI>": [[x, y], ...]}} with
+# polygons in Gaze X/Y coordinates (the axes of the gaze plots on the panorama). Samples and fixations
+# are prefiltered on a grid of AOI_GRID_CELLS x AOI_GRID_CELLS cells before the point-in-polygon test
+AOI_FILE = './data/aois.json'
+AOI_GRID_CELLS = 32
+
+# Box/lasso selections on the gaze & fixation plots of the viewpoints: grid of SPATIAL_GRID_CELLS x
+# SPATIAL_GRID_CELLS cells over the points of each viewpoint (datastore/spatial_index.py)
+SPATIAL_GRID_CELLS = 128
+
+# Fixations/saccades: 'imported' (Fixation */Saccade * columns of the export) or 'computed'
+# (detected from the gaze samples with DETECTION_METHOD below, e.g. for exports without those columns)
+EVENTS_SOURCE = 'imported'
+
+# Fixation/saccade detection (python -m datastore.detection), run per respondent on DETECTION_WORKERS cores (None = all)
+# I-VT: samples slower than IVT_VELOCITY are fixation samples, the velocity is measured on
+#       IVT_SIGNAL: 'gaze3d' (ET_Gaze3D*, deg/s) or 'gaze2d' (Gaze X/Y, px/s)
+# I-DT: windows of at least IDT_MIN_DURATION with a dispersion (px, Gaze X/Y) below IDT_DISPERSION are fixations
+# Fixations shorter than MIN_FIXATION_DURATION (s) are discarded
+DETECTION_METHOD = 'ivt'
+DETECTION_WORKERS = None
+IVT_SIGNAL = 'gaze3d'
+IVT_VELOCITY = 30
+IDT_DISPERSION = 50
+IDT_MIN_DURATION = 0.1
+MIN_FIXATION_DURATION = 0.06
+
+# GSR tonic/phasic signals and peaks: 'imported' (columns of the export) or 'computed' (datastore/gsr.py)
+# Tonic: moving average over GSR_TONIC_WINDOW seconds, phasic: raw - tonic
+# Peak: maximum of a phasic response (above GSR_ONSET) with an amplitude of at least GSR_MIN_AMPLITUDE
+# The samples of a respondent are processed in chunks of GSR_CHUNK
+GSR_SOURCE = 'imported'
+GSR_TONIC_WINDOW = 8.0
+GSR_ONSET = 0.01
+GSR_MIN_AMPLITUDE = 0.02
+GSR_CHUNK = 100000
+
+# Rolling metrics (blink rate, GSR peaks/min, pupil size, head velocity): windows of
+# METRICS_WINDOW seconds, every METRICS_STEP seconds
+METRICS_WINDOW = 60
+METRICS_STEP = 10
+
+# Data quality: a sample is invalid if the eyes are further than QUALITY_MAX_DISTANCE from the
+# glasses, the left pupil is in the outlier band QUALITY_PUPIL_OUTLIERS (mm), or the left eye
+# validity code is QUALITY_INVALID_VALIDITY or higher (0 = certainly valid)
+QUALITY_MAX_DISTANCE = 900
+QUALITY_PUPIL_OUTLIERS = (4.7, 5.3)
+QUALITY_INVALID_VALIDITY = 4
+
+# Production server (gunicorn -c gunicorn.conf.py wsgi:server): SERVER_WORKERS processes (None = one per core)
+# with SERVER_THREADS threads each, listening on SERVER_BIND. The dataset is loaded once, before the
+# workers are forked, and shared by them (see wsgi.py). Requests that take longer than SERVER_TIMEOUT
+# seconds restart the worker.
+SERVER_BIND = '0.0.0.0:8050'
+SERVER_WORKERS = None
+SERVER_THREADS = 4
+SERVER_TIMEOUT = 120
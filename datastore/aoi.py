@@ -0,0 +1,170 @@
+import re
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from config import AOI_FILE, AOI_GRID_CELLS
+from datastore.viewpoints import viewpoint_columns
+
+# Areas of interest (AOIs) on the viewpoint panoramas
+# Every gaze sample and fixation is assigned to the first AOI (polygon) that contains it.
+# The polygons' bounding boxes are put on a coarse grid, so the point-in-polygon test only
+# runs for the points in the cells of a polygon. Stats per respondent & AOI:
+# - Samples / Dwell time (s): gaze samples in the AOI (x the median sampling interval)
+# - Fixations: fixations in the AOI
+# - Time to first fixation (s): from the first sample in the viewpoint to the first fixation in the AOI
+# Computed once for the AOI_FILE (cached next to the data, see datastore/dataset.py) and
+# again for the selected respondents when an AOI is edited on the gaze plot.
+
+# Bump when the stats below change, so the cached table gets rebuilt
+AOI_VERSION = 1
+
+AOI_STATS = ['Samples', 'Dwell time (s)', 'Fixations', 'Time to first fixation (s)']
+
+
+# AOI_FILE -> {viewpoint: {AOI: polygon}} (empty if there is no file)
+def load_aois(path=AOI_FILE):
+    try:
+        with open(path) as f:
+            aois = json.load(f)
+    except OSError:
+        print(f'No areas of interest ({path} not found)')
+        return {}
+    return {int(vp): {name: np.asarray(polygon, dtype=float) for name, polygon in polygons.items()}
+            for vp, polygons in aois.items()}
+
+
+# Hash of the AOIs (for the cached stats and figures)
+def aois_version(aois):
+    state = {vp: {name: polygon.tolist() for name, polygon in polygons.items()} for vp, polygons in aois.items()}
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode()).hexdigest()[:12]
+
+
+AOIS = load_aois()
+AOIS_VERSION = aois_version(AOIS)
+
+
+# Polygon <-> SVG path of a plotly shape ('M x,y L x,y ... Z')
+def polygon_path(polygon):
+    return 'M' + 'L'.join(f'{x:g},{y:g}' for x, y in polygon) + 'Z'
+
+
+def path_polygon(path):
+    numbers = re.findall(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?', path)
+    return np.array(numbers, dtype=float).reshape(-1, 2)
+
+
+# Points (x, y) inside the polygon: crossing number, vectorized over the points
+def points_in_polygon(x, y, polygon):
+    inside = np.zeros(len(x), dtype=bool)
+    for (x0, y0), (x1, y1) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        crosses = (y0 > y) != (y1 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (x < x_cross)
+    return inside
+
+
+class AoiIndex:
+    def __init__(self, polygons, cells=AOI_GRID_CELLS):
+        self.names = list(polygons)
+        self.polygons = [np.asarray(polygon, dtype=float) for polygon in polygons.values()]
+        self.cells = cells
+
+        # Grid over the bounding box of all AOIs
+        boxes = np.array([[p[:, 0].min(), p[:, 0].max(), p[:, 1].min(), p[:, 1].max()]
+                          for p in self.polygons]).reshape(-1, 4)
+        if len(boxes):
+            self.extent = boxes[:, 0].min(), boxes[:, 1].max(), boxes[:, 2].min(), boxes[:, 3].max()
+        else:
+            self.extent = 0, 0, 0, 0
+
+        # polygon -> cells that its bounding box overlaps
+        self.candidates = np.zeros((len(self.polygons), cells * cells), dtype=bool)
+        for i, (x0, x1, y0, y1) in enumerate(boxes):
+            cx0, cy0 = self.cell_xy(np.array([x0]), np.array([y0]))
+            cx1, cy1 = self.cell_xy(np.array([x1]), np.array([y1]))
+            grid = self.candidates[i].reshape(cells, cells)
+            grid[cy0[0]:cy1[0] + 1, cx0[0]:cx1[0] + 1] = True
+
+    # Column and row of the cells of the points (clipped to the grid)
+    def cell_xy(self, x, y):
+        x0, x1, y0, y1 = self.extent
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cx = (x - x0) / (x1 - x0) * self.cells
+            cy = (y - y0) / (y1 - y0) * self.cells
+        return (np.clip(np.nan_to_num(cx), 0, self.cells - 1).astype(np.int64),
+                np.clip(np.nan_to_num(cy), 0, self.cells - 1).astype(np.int64))
+
+    # AOI number (position in names) of every point, -1 if none
+    def hits(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        out = np.full(len(x), -1, dtype=np.int16)
+        x0, x1, y0, y1 = self.extent
+        in_grid = np.flatnonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))
+        cx, cy = self.cell_xy(x[in_grid], y[in_grid])
+        cell = cy * self.cells + cx
+        for i, polygon in enumerate(self.polygons):
+            points = in_grid[self.candidates[i][cell] & (out[in_grid] == -1)]
+            out[points[points_in_polygon(x[points], y[points], polygon)]] = i
+        return out
+
+
+# Stats per respondent & AOI of one viewpoint
+# samples: the rows of the viewpoint (Resp name, Timestamp (s), Gaze X, Gaze Y), fixations: its fixations
+def aoi_stats(samples, fixations, index):
+    n = len(index.names)
+    t = samples['Timestamp (s)'].to_numpy(dtype=float)
+    hits = index.hits(samples['Gaze X'].to_numpy(), samples['Gaze Y'].to_numpy())
+    fixation_hits = index.hits(fixations['Fixation X'].to_numpy(), fixations['Fixation Y'].to_numpy())
+    fixation_start = fixations['Start (s)'].to_numpy(dtype=float)
+    fixation_groups = fixations.groupby('Resp name', observed=True).indices
+
+    rows = []
+    for name, sample_rows in samples.groupby('Resp name', observed=True).indices.items():
+        ts = np.sort(t[sample_rows])
+        interval = np.median(np.diff(ts)) if len(ts) > 1 else 0.0
+        h = hits[sample_rows]
+        counts = np.bincount(h[h >= 0], minlength=n)
+
+        f = fixation_groups.get(name, np.empty(0, dtype=np.int64))
+        fh, fstart = fixation_hits[f], fixation_start[f]
+        fixation_counts = np.bincount(fh[fh >= 0], minlength=n)
+        first = np.full(n, np.inf)
+        np.minimum.at(first, fh[fh >= 0], fstart[fh >= 0])
+
+        for i, aoi in enumerate(index.names):
+            rows.append({'Resp name': name, 'AOI': aoi,
+                         'Samples': counts[i],
+                         'Dwell time (s)': counts[i] * interval,
+                         'Fixations': fixation_counts[i],
+                         'Time to first fixation (s)': first[i] - ts[0] if np.isfinite(first[i]) else np.nan})
+    return pd.DataFrame(rows, columns=['Resp name', 'AOI'] + AOI_STATS)
+
+
+# Stats of all viewpoints with AOIs (one row per respondent, viewpoint and AOI)
+def build_aoi_table(df, fixations, aois=AOIS):
+    columns = viewpoint_columns(df)
+    parts = []
+    for vp, polygons in aois.items():
+        if vp not in columns or not polygons:
+            continue
+        samples = df.loc[df[columns[vp]].to_numpy() == 1, ['Resp name', 'Timestamp (s)', 'Gaze X', 'Gaze Y']]
+        part = aoi_stats(samples, fixations[fixations['Viewpoint'].to_numpy() == vp], AoiIndex(polygons))
+        part.insert(1, 'Viewpoint', vp)
+        parts.append(part)
+
+    if not parts:
+        return pd.DataFrame(columns=['Resp name', 'Viewpoint', 'AOI'] + AOI_STATS)
+    table = pd.concat(parts, ignore_index=True)
+    table['Resp name'] = table['Resp name'].astype('category')
+    return table
+
+
+# AOI stats of the respondents (names) in viewpoint vp
+def select_aoi_stats(table, names, vp):
+    selected = table['Resp name'].isin(names) & (table['Viewpoint'] == vp)
+    return table[selected.to_numpy()]
@@ -0,0 +1,80 @@
+import os
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Column store: the prepared df as a directory with one typed binary file (.npy) per column
+# The files are memory-mapped (np.load(mmap_mode='r')) instead of read: opening the store is
+# near-instant and only the pages of the columns (and rows) that are used get loaded. The OS keeps
+# them in its page cache, which is shared by all server processes (see wsgi.py).
+# - numeric/datetime columns: <n>.npy (n = position of the column, the names are in columns.json)
+# - categorical columns: the codes (<n>.npy), the categories are in columns.json
+# - other (text) columns can't be mapped: <n>.pkl, read into memory
+# The frame is built with pd.DataFrame(columns, copy=False), which keeps the mapped arrays as they
+# are with pandas >= 2 (requirements.txt; pandas 1.x copied them into one array in memory per dtype
+# the first time the frame was filtered, see tests/test_column_store.py).
+# Filtered dfs are copies of the selected rows, except a single row range (ROW_ORDER = 'respondent',
+# see datastore/row_ranges.py), which stays a view of the mapped columns.
+
+STORE_META = 'columns.json'
+
+
+def column_file(directory, i, kind):
+    return os.path.join(directory, f'{i}.{"pkl" if kind == "object" else "npy"}')
+
+
+def write_columns(df, directory):
+    tmp = directory + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            kind = 'category'
+            np.save(column_file(tmp, i, kind), values.cat.codes.to_numpy())
+            columns.append({'name': col, 'kind': kind, 'categories': values.cat.categories.tolist()})
+        elif values.dtype.kind in 'biufM':
+            kind = 'numpy'
+            np.save(column_file(tmp, i, kind), values.to_numpy())
+            columns.append({'name': col, 'kind': kind})
+        else:
+            kind = 'object'
+            values.reset_index(drop=True).to_pickle(column_file(tmp, i, kind))
+            columns.append({'name': col, 'kind': kind})
+
+    with open(os.path.join(tmp, STORE_META), 'w') as f:
+        json.dump({'rows': len(df), 'columns': columns}, f, indent=2)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def read_columns(directory):
+    with open(os.path.join(directory, STORE_META)) as f:
+        meta = json.load(f)
+
+    columns = {}
+    for i, col in enumerate(meta['columns']):
+        path = column_file(directory, i, col['kind'])
+        if col['kind'] == 'category':
+            columns[col['name']] = pd.Categorical.from_codes(np.load(path, mmap_mode='r'), col['categories'])
+        elif col['kind'] == 'numpy':
+            columns[col['name']] = np.load(path, mmap_mode='r')
+        else:
+            columns[col['name']] = pd.read_pickle(path).to_numpy()
+    return column_frame(columns, pd.RangeIndex(meta['rows']))
+
+
+# Df of the columns (name -> 1D array), without copying them where pandas allows it
+def column_frame(columns, index):
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+# Df with some columns replaced/added, sharing the other columns with df where pandas allows it
+def with_columns(df, new):
+    columns = {col: df[col] for col in df.columns}
+    columns.update(new)
+    return column_frame(columns, df.index)
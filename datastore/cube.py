@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from datastore.viewpoints import viewpoint_columns
+
+# Aggregate cube: sums and counts per (respondent, viewpoint), built once per version
+# of the data and cached next to it (see load_derived in datastore/load_data.py).
+# Fixations and saccades are counted in the viewpoint where they start.
+# Stats of any respondent selection are sums over a few cube rows, e.g.
+#   mean GSR = sum(gsr_sum) / sum(gsr_count)
+# A row that is in 2 viewpoints counts for both.
+
+# Bump when the columns below change, so the cached cube gets rebuilt
+CUBE_VERSION = 2
+
+# column in the cube -> (column in the df, aggregation)
+CUBE_AGGS = {
+    'samples': ('Resp name', 'size'),
+    'blink_sum': ('Blink detected (binary)', 'sum'),
+    'blink_count': ('Blink detected (binary)', 'count'),
+    'peaks': ('Peak', 'sum'),
+    'gsr_sum': ('GSR Raw (microSiemens)', 'sum'),
+    'gsr_count': ('GSR Raw (microSiemens)', 'count'),
+}
+
+# Fixations/saccades come from the event tables (datastore/events.py): one row per event
+FIXATION_AGGS = {
+    'fixations': ('Fixation Index', 'size'),
+    'fix_dur_sum': ('Fixation Duration', 'sum'),
+    'fix_dur_count': ('Fixation Duration', 'count'),
+    'fix_dis_sum': ('Fixation Dispersion', 'sum'),
+    'fix_dis_count': ('Fixation Dispersion', 'count'),
+}
+SACCADE_AGGS = {
+    'saccades': ('Saccade Index', 'size'),
+    'sac_dur_sum': ('Saccade Duration', 'sum'),
+    'sac_dur_count': ('Saccade Duration', 'count'),
+    'sac_amp_sum': ('Saccade Amplitude', 'sum'),
+    'sac_amp_count': ('Saccade Amplitude', 'count'),
+}
+
+
+def event_aggregates(events, aggs):
+    events = events[events['Viewpoint'] > 0].astype({'Resp name': str})
+    events = events.astype({col: 'float64' for col, agg in aggs.values() if agg == 'sum'})
+    return events.groupby(['Resp name', 'Viewpoint']).agg(**aggs)
+
+
+def build_cube(df, fixations, saccades):
+    columns = viewpoint_columns(df)
+    source_cols = sorted({col for col, agg in CUBE_AGGS.values() if col in df.columns})
+
+    # (row, viewpoint) of every active flag
+    flags = np.column_stack([df[col].to_numpy() == 1 for col in columns.values()])
+    rows, which = np.nonzero(flags)
+    long = pd.DataFrame({col: df[col].to_numpy(dtype='float64')[rows]     # float64 sums
+                         for col in source_cols if col != 'Resp name'})
+    long['Resp name'] = df['Resp name'].to_numpy().astype(str)[rows]
+    long['Viewpoint'] = np.array(list(columns))[which]
+    long['Peak'] = df['Peak detected (binary)'].to_numpy()[rows] == 1
+
+    cube = long.groupby(['Resp name', 'Viewpoint']).agg(**CUBE_AGGS)
+    cube = cube.join(event_aggregates(fixations, FIXATION_AGGS)).join(event_aggregates(saccades, SACCADE_AGGS))
+    return cube.fillna(0).reset_index()
+
+
+# Cube rows of the respondents, summed per viewpoint
+def cube_totals(cube, names=None):
+    if names is not None:
+        cube = cube[cube['Resp name'].isin(names)]
+    return cube.drop(columns='Resp name').groupby('Viewpoint').sum()
@@ -0,0 +1,228 @@
+import os
+
+import numpy as np
+import pandas as pd
+from dash.exceptions import PreventUpdate
+
+from config import (CACHE_DIR, ROW_ORDER, FILTER_CACHE_MB, METRICS_WINDOW, METRICS_STEP, GSR_SOURCE, GSR_TONIC_WINDOW,
+                    GSR_ONSET, GSR_MIN_AMPLITUDE, QUALITY_MAX_DISTANCE, QUALITY_PUPIL_OUTLIERS,
+                    QUALITY_INVALID_VALIDITY, EVENTS_SOURCE, DETECTION_METHOD, IVT_SIGNAL, IVT_VELOCITY,
+                    IDT_DISPERSION, IDT_MIN_DURATION, MIN_FIXATION_DURATION)
+from datastore.load_data import load_data, load_derived, dataset_version
+from datastore.column_store import with_columns
+from datastore.filter_index import FilterIndex
+from datastore.row_ranges import RowRanges
+from datastore.respondents import respondent_table, select_respondents
+from datastore.events import build_fixations, build_saccades, select_events, EVENTS_VERSION
+from datastore.detection import detect, DETECTED_COLS, DETECTION_VERSION
+from datastore.cube import build_cube, CUBE_VERSION
+from datastore.gsr import process_gsr, GSR_COLS, GSR_VERSION
+from datastore.metrics import build_metrics, select_metrics, METRICS_VERSION
+from datastore.quality import invalid_masks, build_scorecard, select_scorecard, QUALITY_VERSION
+from datastore.aoi import build_aoi_table, select_aoi_stats, AOI_VERSION, AOIS_VERSION
+from datastore.spatial_index import viewpoint_indexes, select_rows
+from datastore.time_index import TimeIndex
+from datastore.segments import build_segments, select_segments, segment_rows, SEGMENTS_VERSION
+from datastore.filter_cache import FilterCache, filter_key
+from datastore.figure_cache import open_figure_cache
+from datastore.pyramid import TimeSeriesPyramids, SIGNALS
+
+# The data of the dashboard, loaded once per server process
+# Callbacks import the (filtered) df from here: 'from datastore.dataset import filtered_df'
+
+# Load in the data (sorted & typed, from the cache if the CSV didn't change)
+# With DATA_STORE = 'columns' the columns are memory-mapped files, shared by all server processes
+print('Loading df...')
+df = load_data()
+version = dataset_version()
+
+# Tonic/phasic signals & peaks computed from the raw GSR, instead of the export's (GSR_SOURCE in config.py)
+# When the export changes, the saved streams continue with the samples appended to it
+if GSR_SOURCE == 'computed':
+    version += f'-gsr{GSR_VERSION}_{GSR_TONIC_WINDOW}_{GSR_ONSET}_{GSR_MIN_AMPLITUDE}'
+    gsr = load_derived('gsr', lambda: process_gsr(df, state_path=os.path.join(CACHE_DIR, 'gsr-state.pkl')), version)
+    df = with_columns(df, {col: gsr[col].to_numpy() for col in GSR_COLS})
+
+# Fixation/saccade columns detected from the gaze samples, instead of the export's (EVENTS_SOURCE in config.py)
+if EVENTS_SOURCE == 'computed':
+    threshold = IVT_VELOCITY if DETECTION_METHOD == 'ivt' else IDT_DISPERSION
+    version += (f'-det{DETECTION_VERSION}_{DETECTION_METHOD}_{threshold}_{MIN_FIXATION_DURATION}'
+                + (f'_{IVT_SIGNAL}' if DETECTION_METHOD == 'ivt' else f'_{IDT_MIN_DURATION}'))
+    detected = load_derived('detection', lambda: detect(df)[DETECTED_COLS], version)
+    df = with_columns(df, {col: detected[col].to_numpy() for col in DETECTED_COLS})
+
+# One row per respondent (gender, age, recording start, rows)
+respondents = respondent_table(df)
+
+# One row per fixation/saccade
+fixations = load_derived('fixations', lambda: build_fixations(df), f'{version}-e{EVENTS_VERSION}')
+saccades = load_derived('saccades', lambda: build_saccades(df), f'{version}-e{EVENTS_VERSION}')
+
+# Rolling metrics per respondent (blink rate, GSR peaks/min, pupil size, head velocity)
+metrics = load_derived('metrics', lambda: build_metrics(df),
+                       f'{version}-m{METRICS_VERSION}_{METRICS_WINDOW}_{METRICS_STEP}')
+
+# Sums/counts per respondent & viewpoint (home page stats)
+cube = load_derived('cube', lambda: build_cube(df, fixations, saccades), f'{version}-e{EVENTS_VERSION}-c{CUBE_VERSION}')
+
+# Dwell time, fixations & time to first fixation per respondent and area of interest (AOI_FILE)
+aoi_table = load_derived('aois', lambda: build_aoi_table(df, fixations),
+                         f'{version}-e{EVENTS_VERSION}-a{AOI_VERSION}_{AOIS_VERSION}')
+
+# Invalid samples (data quality checks) and the scorecard per respondent & viewpoint
+quality = invalid_masks(df)
+scorecard = load_derived('scorecard', lambda: build_scorecard(df, quality),
+                         f'{version}-q{QUALITY_VERSION}_{QUALITY_MAX_DISTANCE}_{QUALITY_PUPIL_OUTLIERS[0]}'
+                         f'_{QUALITY_PUPIL_OUTLIERS[1]}_{QUALITY_INVALID_VALIDITY}')
+
+# Bitmaps for the respondent/viewpoint/quality filters (built once)
+filter_index = FilterIndex(df, valid=~quality['Invalid'])
+
+# Visits of the respondents to the viewpoints (route timeline, dwell times, viewpoint filter)
+segments = load_derived('segments', lambda: build_segments(df), f'{version}-s{SEGMENTS_VERSION}')
+
+# Respondent/viewpoint row ranges (only when the rows are grouped by respondent)
+row_ranges = RowRanges(df, segments) if ROW_ORDER == 'respondent' else None
+
+# Grids over the gaze points & fixations of every viewpoint (box/lasso selections on the viewpoint pages)
+spatial_indexes = {'gaze': viewpoint_indexes(df, 'Gaze X', 'Gaze Y'),
+                   'fixations': viewpoint_indexes(df, 'Fixation X', 'Fixation Y')}
+
+# Rows per respondent sorted by time (time windows brushed on the time graphs)
+time_index = TimeIndex(df)
+
+# Min/max pyramids of the time series (zooming in the full route graphs)
+pyramids = TimeSeriesPyramids(df, 'Timestamp (s)', SIGNALS)
+
+# Filtered dfs of recent filter/viewpoint combinations
+filter_cache = FilterCache(FILTER_CACHE_MB * 1024 ** 2)
+
+# Built figures, for this version of the data
+figure_cache = open_figure_cache(version)
+
+
+# Respondent filters of the Store: genders, ages, begin and end time (None if not valid times)
+def parse_filters(data):
+    timebegin = pd.to_datetime(data['time'][0], errors='coerce')
+    timeend = pd.to_datetime(data['time'][1], errors='coerce')
+
+    if(type(timebegin) != pd.Timestamp or type(timeend) != pd.Timestamp):    # Check if begin/endtime is timestamp
+        timebegin, timeend = None, None
+    return data['gender'], data['age'], timebegin, timeend
+
+
+# Rows of the respondent table that match the respondent filters
+def filtered_respondents(data):
+    return select_respondents(respondents, *parse_filters(data))
+
+
+# Fixations of the respondents that match the filters (optionally only in viewpoint vp)
+def filtered_fixations(data, vp=None):
+    return select_events(fixations, filtered_respondents(data).index, vp)
+
+
+# Rolling metrics of the respondents that match the filters (optionally only in viewpoint vp)
+def filtered_metrics(data, vp=None):
+    return select_metrics(metrics, filtered_respondents(data).index, vp)
+
+
+# AOI stats of the respondents that match the filters in viewpoint vp
+def filtered_aoi_stats(data, vp):
+    return select_aoi_stats(aoi_table, filtered_respondents(data).index, vp)
+
+
+# Viewpoint segments of the respondents that match the filters
+def filtered_segments(data, vp=None):
+    return select_segments(segments, filtered_respondents(data).index, vp)
+
+
+# Data quality scorecard of the respondents that match the filters (full route, or viewpoint vp)
+def filtered_scorecard(data, vp=None):
+    return select_scorecard(scorecard, filtered_respondents(data).index, vp)
+
+
+# Apply the respondent filters (Store), the viewpoint and the quality filter to the full df
+def filter_df(data, vp):
+    # Respondent filters are the same for all rows of a respondent: filter the respondent table,
+    # then take the rows of the respondents (row ranges) or of their viewpoint segments
+    # (the row ranges/segments don't know the invalid samples, the quality filter uses the bitmaps)
+    if not data.get('exclude_invalid') and (row_ranges is not None or vp is not None):
+        names = filtered_respondents(data).index
+        if len(names) == 0:
+            raise PreventUpdate
+        if row_ranges is not None:
+            return row_ranges.take(df, names, vp)
+        rows = segment_rows(select_segments(segments, names, vp), time_index.rows['Timestamp (s)'])
+        return df.take(np.sort(rows))
+
+    # Respondent filters (bitmaps):
+    selection = filter_index.respondents(*parse_filters(data))
+
+    # If respondent filters don't match anything, don't update
+    if not selection.any():
+        raise PreventUpdate
+
+    if vp is not None:
+        selection = filter_index.in_viewpoint(selection, vp)
+    if data.get('exclude_invalid'):
+        selection = filter_index.only_valid(selection)
+    return df[filter_index.mask(selection)]
+
+
+# Filtered df, unless this combination was filtered before
+def filtered_df(data, vp=None):
+    key = filter_key(data, vp)
+    dff = filter_cache.get(key)
+    if dff is None:
+        dff = filter_df(data, vp)
+        filter_cache.put(key, dff)
+    return dff
+
+
+# '/viewpoint-N' -> N (None for the other pages and unknown viewpoints)
+def pathname_viewpoint(pathname):
+    if pathname and pathname.startswith('/viewpoint-'):
+        vp = pathname[len('/viewpoint-'):]
+        if vp.isdigit() and int(vp) in filter_index.viewpoint:
+            return int(vp)
+    return None
+
+
+# Restrict a filtered df of viewpoint vp to the samples in a box/lasso selection (Store 'gaze-selection')
+# selection: {'graph': 'gaze' or 'fixations', 'box' or 'lasso': ...} (see datastore/spatial_index.py)
+def apply_selection(dff, vp, selection):
+    if not selection or vp is None or vp not in spatial_indexes[selection['graph']]:
+        return dff
+    selected = np.zeros(len(df), dtype=bool)
+    selected[select_rows(spatial_indexes[selection['graph']][vp], selection)] = True
+    return dff[selected[dff.index.to_numpy()]]
+
+
+# Rows (mask over the full df) of the filtered respondents in a brushed time window (Store 'time-window')
+# window: {'column': 'Timestamp (s)' or 'Relative timestamp (s)', 'range': [t0, t1]}
+def window_mask(data, window):
+    column, (t0, t1) = window['column'], window['range']
+    return time_index.window_mask(len(df), filtered_respondents(data).index, column, t0, t1)
+
+
+# Respondents that match the filters, and the rows (mask over the full df, None = all their rows)
+# that the quality filter and a brushed time window keep (for the pyramid queries of the zoom graphs)
+def filtered_rows(data, window=None):
+    keep = ~quality['Invalid'] if data.get('exclude_invalid') else None
+    if window:
+        in_window = window_mask(data, window)
+        keep = in_window if keep is None else keep & in_window
+    return list(filtered_respondents(data).index), keep
+
+
+# Restrict the filtered df, fixations and rolling metrics to a brushed time window
+# (the metric windows of METRICS_WINDOW seconds that overlap it, the time of a window is its end)
+def apply_window(data, window, dff, fixations, metrics):
+    if not window:
+        return dff, fixations, metrics
+    in_window = window_mask(data, window)
+    t0, t1 = window['range']
+    ends = metrics[window['column']].to_numpy()
+    return (dff[in_window[dff.index.to_numpy()]],
+            fixations[in_window[fixations['First row'].to_numpy()]],
+            metrics[(ends >= t0) & (ends - METRICS_WINDOW <= t1)])
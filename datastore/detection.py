@@ -0,0 +1,218 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import (DETECTION_METHOD, DETECTION_WORKERS, IVT_SIGNAL, IVT_VELOCITY,
+                    IDT_DISPERSION, IDT_MIN_DURATION, MIN_FIXATION_DURATION)
+from datastore.viewpoints import viewpoint_columns
+from datastore.events import build_fixations, build_saccades
+
+# Fixation/saccade detection on the raw gaze samples (for exports without iMotions' Fixation/Saccade columns,
+# or to compare other thresholds with them)
+# - 'ivt': velocity threshold (on the 3D gaze direction or the 2D gaze point)
+# - 'idt': dispersion threshold (on the 2D gaze point)
+# The result has the same Fixation */Saccade * columns as the export, so the event
+# tables (datastore/events.py) can be built from it. Respondents are processed in parallel.
+
+# With EVENTS_SOURCE = 'computed' (config.py) the dashboard uses the detected columns (datastore/dataset.py).
+# Run 'python -m datastore.detection [ivt|idt] [threshold]' to compare with the imported columns.
+
+# Bump when the detection below changes, so the cached detected columns get rebuilt
+DETECTION_VERSION = 1
+
+SIGNALS = {'gaze3d': ['ET_Gaze3DX', 'ET_Gaze3DY', 'ET_Gaze3DZ'],
+           'gaze2d': ['Gaze X', 'Gaze Y']}
+
+DETECTED_COLS = ['Fixation Index', 'Fixation X', 'Fixation Y', 'Fixation Duration', 'Fixation Dispersion',
+                 'Saccade Index', 'Saccade Duration', 'Saccade Amplitude']
+
+
+# Velocity of every sample (from the previous sample): deg/s for 3D directions, units/s for 2D points
+def velocity(t, coords):
+    dt = np.diff(t)
+    if coords.shape[1] == 3:
+        unit = coords / np.linalg.norm(coords, axis=1, keepdims=True)
+        cos = np.clip(np.sum(unit[1:] * unit[:-1], axis=1), -1, 1)
+        dist = np.degrees(np.arccos(cos))
+    else:
+        dist = np.hypot(*np.diff(coords, axis=0).T)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v = np.where(dt > 0, dist / dt, np.nan)
+    return np.r_[v[:1], v] if len(v) else np.full(len(t), np.nan)
+
+
+# Start/stop (exclusive) of the runs of True in mask
+def runs(mask):
+    edges = np.diff(np.r_[0, mask.astype(np.int8), 0])
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+# Rows of the runs and the run number of every row
+def run_rows(starts, stops):
+    lengths = stops - starts
+    ids = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    return np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths), ids, offsets
+
+
+def ivt(t, coords, threshold=IVT_VELOCITY):
+    v = velocity(t, coords)
+    return runs(v < threshold)
+
+
+# Max - min of values in the windows [starts, stops): sparse table of the window minima/maxima,
+# with only as many levels as the longest window needs (NaN is ignored)
+def window_ptp(values, starts, stops):
+    k = np.floor(np.log2(stops - starts)).astype(np.int64)
+    lows, highs = [values], [values]
+    for level in range(1, k.max() + 1 if len(k) else 1):
+        half = 1 << (level - 1)
+        lows.append(np.fmin(lows[-1][:-half], lows[-1][half:]))
+        highs.append(np.fmax(highs[-1][:-half], highs[-1][half:]))
+
+    ptp = np.empty(len(starts))
+    for level in np.unique(k):
+        at = k == level
+        a, b = starts[at], stops[at] - (1 << level)
+        ptp[at] = np.fmax(highs[level][a], highs[level][b]) - np.fmin(lows[level][a], lows[level][b])
+    return ptp
+
+
+def idt(t, x, y, threshold=IDT_DISPERSION, min_duration=IDT_MIN_DURATION):
+    n = len(t)
+    starts, stops = [], []
+    valid = ~(np.isnan(x) | np.isnan(y))
+
+    # Candidate starts: the smallest window of min_duration from there is valid and below the threshold
+    ends = np.searchsorted(t, t + min_duration, side='left') + 1
+    first = np.arange(np.searchsorted(ends, n, side='right'))
+    ends = ends[first]
+    invalid = np.r_[0, np.cumsum(~valid)]
+    candidate = invalid[ends] == invalid[first]
+    candidate[candidate] = (window_ptp(x, first[candidate], ends[candidate])
+                            + window_ptp(y, first[candidate], ends[candidate]) <= threshold)
+    candidates = first[candidate]
+
+    i = 0
+    while True:
+        # next candidate start at or after i
+        c = np.searchsorted(candidates, i)
+        if c == len(candidates):
+            break
+        i = candidates[c]
+        j = ends[i]
+
+        # grow the window while the dispersion stays below the threshold (chunks of samples at once)
+        lo_x, hi_x, lo_y, hi_y = x[i:j].min(), x[i:j].max(), y[i:j].min(), y[i:j].max()
+        chunk = j - i
+        while j < n:
+            tail = slice(j, min(j + chunk, n))
+            hx = np.maximum.accumulate(np.r_[hi_x, x[tail]])[1:]
+            lx = np.minimum.accumulate(np.r_[lo_x, x[tail]])[1:]
+            hy = np.maximum.accumulate(np.r_[hi_y, y[tail]])[1:]
+            ly = np.minimum.accumulate(np.r_[lo_y, y[tail]])[1:]
+            over = ~valid[tail] | ((hx - lx) + (hy - ly) > threshold)
+            if over.any():
+                j += int(np.argmax(over))
+                break
+            lo_x, hi_x, lo_y, hi_y = lx[-1], hx[-1], ly[-1], hy[-1]
+            j = tail.stop
+            chunk *= 2
+        starts.append(i)
+        stops.append(j)
+        i = j
+    return np.array(starts, dtype=np.int64), np.array(stops, dtype=np.int64)
+
+
+# Fixation/saccade columns of one respondent (samples sorted by time)
+# args: (t, x, y, coords, method, threshold)
+def detect_respondent(args):
+    t, x, y, coords, method, threshold = args
+    n = len(t)
+    if method == 'ivt':
+        starts, stops = ivt(t, coords, threshold)
+    else:
+        starts, stops = idt(t, x, y, threshold)
+
+    # discard short fixations
+    keep = t[stops - 1] - t[starts] >= MIN_FIXATION_DURATION
+    starts, stops = starts[keep], stops[keep]
+    fixation = np.zeros(n, dtype=bool)
+    rows, ids, offsets = run_rows(starts, stops)
+    fixation[rows] = True
+
+    out = {col: np.full(n, np.nan) for col in DETECTED_COLS}
+    if len(starts):
+        valid = ~(np.isnan(x[rows]) | np.isnan(y[rows]))
+        counts = np.bincount(ids, weights=valid, minlength=len(starts))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fx = np.bincount(ids, weights=np.where(valid, x[rows], 0), minlength=len(starts)) / counts
+            fy = np.bincount(ids, weights=np.where(valid, y[rows], 0), minlength=len(starts)) / counts
+        dispersion = (np.fmax.reduceat(x[rows], offsets) - np.fmin.reduceat(x[rows], offsets)
+                      + np.fmax.reduceat(y[rows], offsets) - np.fmin.reduceat(y[rows], offsets))
+        out['Fixation Index'][rows] = ids + 1
+        out['Fixation X'][rows] = fx[ids]
+        out['Fixation Y'][rows] = fy[ids]
+        out['Fixation Duration'][rows] = ((t[stops - 1] - t[starts]) * 1000)[ids]
+        out['Fixation Dispersion'][rows] = dispersion[ids]
+
+    # saccades: the valid samples between fixations
+    valid = ~(np.isnan(x) | np.isnan(y))
+    s_starts, s_stops = runs(~fixation & valid)
+    rows, ids, offsets = run_rows(s_starts, s_stops)
+    if len(s_starts):
+        out['Saccade Index'][rows] = ids + 1
+        out['Saccade Duration'][rows] = ((t[s_stops - 1] - t[s_starts]) * 1000)[ids]
+        out['Saccade Amplitude'][rows] = np.hypot(x[s_stops - 1] - x[s_starts], y[s_stops - 1] - y[s_starts])[ids]
+    return out
+
+
+# df -> the columns needed for the event tables, with detected Fixation */Saccade * columns
+def detect(df, method=DETECTION_METHOD, threshold=None, workers=DETECTION_WORKERS):
+    if threshold is None:
+        threshold = IVT_VELOCITY if method == 'ivt' else IDT_DISPERSION
+    detected = df[['Resp name', 'Timestamp (s)'] + list(viewpoint_columns(df).values())].copy()
+
+    t_all = df['Timestamp (s)'].to_numpy(dtype=float)
+    x_all = df['Gaze X'].to_numpy(dtype=float)
+    y_all = df['Gaze Y'].to_numpy(dtype=float)
+    coords_all = df[SIGNALS[IVT_SIGNAL]].to_numpy(dtype=float)
+
+    # respondent -> rows, sorted by time
+    groups = [rows[np.argsort(t_all[rows], kind='stable')]
+              for rows in df.groupby('Resp name', observed=True).indices.values()]
+    jobs = [(t_all[rows], x_all[rows], y_all[rows], coords_all[rows], method, threshold) for rows in groups]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(detect_respondent, jobs))
+
+    for col in DETECTED_COLS:
+        values = np.full(len(df), np.nan)
+        for rows, out in zip(groups, results):
+            values[rows] = out[col]
+        detected[col] = values
+    return detected
+
+
+# Fixations per respondent: amount and mean duration, imported vs. detected
+def compare_events(imported, detected):
+    def summary(events):
+        return events.groupby('Resp name', observed=True).agg(
+            fixations=('Fixation Index', 'size'),
+            duration=('Fixation Duration', 'mean'))
+    return summary(imported).join(summary(detected), lsuffix=' (imported)', rsuffix=' (detected)')
+
+
+if __name__ == '__main__':
+    from datastore.load_data import load_data
+
+    method = sys.argv[1] if len(sys.argv) > 1 else DETECTION_METHOD
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    df = load_data()
+    detected = detect(df, method, threshold)
+    fixations = build_fixations(detected)
+    print(f'{method}: {len(fixations)} fixations, {len(build_saccades(detected))} saccades')
+    pd.set_option('display.width', 200)
+    pd.set_option('display.max_columns', None)
+    print(compare_events(build_fixations(df), fixations))
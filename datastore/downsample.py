@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from config import LINE_POINT_BUDGET, DOWNSAMPLE_METHOD
+
+# Downsampling of time series before they are plotted (per respondent/trace)
+# - 'lttb':   Largest-Triangle-Three-Buckets, keeps the visual shape of the line
+# - 'minmax': min & max of every bucket (envelope), keeps all extremes
+# Rows marked in keep_col (e.g. detected GSR peaks) are always kept.
+
+
+# Indices of n_out points of (x, y) chosen with LTTB (x sorted)
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+
+    # averages of all buckets (+ the last point as the bucket after the last one)
+    counts = np.diff(np.r_[edges, n])
+    avg_x = np.add.reduceat(x, edges) / counts
+    avg_y = np.add.reduceat(y, edges) / counts
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xs, ys = x[lo:hi], y[lo:hi]
+
+        # area of the triangle (previous point, candidate, average of next bucket)
+        area = np.abs((x[a] - avg_x[i + 1]) * (ys - y[a])
+                      - (x[a] - xs) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+# Indices of the min and max of n_out / 2 buckets (x sorted)
+def minmax(x, y, n_out):
+    n = len(y)
+    buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    size = int(np.ceil(n / buckets))
+    padded = np.full(size * buckets, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    filled = ~np.isnan(padded).all(axis=1)
+    offsets = np.arange(buckets)[filled] * size
+    lows = offsets + np.nanargmin(padded[filled], axis=1)
+    highs = offsets + np.nanargmax(padded[filled], axis=1)
+    return np.unique(np.r_[0, lows, highs, n - 1])
+
+
+METHODS = {'lttb': lttb, 'minmax': minmax}
+
+
+# Downsample the line y(x) of every respondent to at most ~budget points
+def downsample(df, x, y, budget=LINE_POINT_BUDGET, group='Resp name',
+               keep_col='Peak detected (binary)', method=DOWNSAMPLE_METHOD):
+    cols = [c for c in dict.fromkeys([group, x, y, keep_col]) if c in df.columns]
+    parts = []
+    for name, part in df[cols].groupby(group, sort=False, observed=True):
+        part = part[part[y].notna()].sort_values(x, kind='mergesort')
+        if len(part) <= budget:
+            parts.append(part)
+            continue
+
+        idx = METHODS[method](part[x].to_numpy(dtype=float), part[y].to_numpy(dtype=float), budget)
+        if keep_col in part.columns:
+            idx = np.union1d(idx, np.flatnonzero(part[keep_col].to_numpy() == 1))
+        parts.append(part.iloc[idx])
+
+    if len(parts) == 0:
+        return df[cols].iloc[0:0]
+    return pd.concat(parts)
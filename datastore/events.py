@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from datastore.viewpoints import viewpoint_columns
+
+# Event tables: one row per fixation / saccade (key: respondent + index)
+# The samples of an event all repeat its coordinates, duration etc., so plots and
+# stats of fixations/saccades use these tables instead of the samples.
+# Columns: Resp name, <index>, First row, Samples, Start (s), End (s) (Timestamp (s)),
+# Viewpoint (active at the start of the event, 0 = none) and the event stats.
+# Built once per version of the data and cached next to it (see datastore/dataset.py).
+
+# Bump when the tables below change, so the cached tables get rebuilt
+EVENTS_VERSION = 1
+
+FIXATION_STATS = ['Fixation X', 'Fixation Y', 'Fixation Duration', 'Fixation Dispersion']
+SACCADE_STATS = ['Saccade Duration', 'Saccade Amplitude']
+
+
+# Number of the viewpoint that is active in each of the rows (lowest if more, 0 if none)
+def row_viewpoints(df, rows):
+    vps = np.zeros(len(rows), dtype=np.int8)
+    for vp, col in sorted(viewpoint_columns(df).items(), reverse=True):
+        vps[df[col].to_numpy()[rows] == 1] = vp
+    return vps
+
+
+def build_events(df, index_col, stats):
+    stats = [col for col in stats if col in df.columns]
+    rows = np.flatnonzero(df[index_col].notna().to_numpy())
+    samples = pd.DataFrame({'Resp name': df['Resp name'].to_numpy()[rows],
+                            index_col: df[index_col].to_numpy()[rows].astype(np.int32),
+                            'Row': rows,
+                            'Time': df['Timestamp (s)'].to_numpy()[rows]})
+    for col in stats:
+        samples[col] = df[col].to_numpy()[rows]
+
+    events = samples.groupby(['Resp name', index_col], sort=False).agg(**{
+        'First row': ('Row', 'min'),
+        'Samples': ('Row', 'size'),
+        'Start (s)': ('Time', 'min'),
+        'End (s)': ('Time', 'max'),
+        **{col: (col, 'first') for col in stats}})
+    events = events.sort_values('First row').reset_index()
+    events['Resp name'] = events['Resp name'].astype('category')
+    events['Samples'] = events['Samples'].astype(np.int32)
+    events['Viewpoint'] = row_viewpoints(df, events['First row'].to_numpy())
+    events[stats] = events[stats].astype('float32')
+    return events
+
+
+def build_fixations(df):
+    return build_events(df, 'Fixation Index', FIXATION_STATS)
+
+
+def build_saccades(df):
+    return build_events(df, 'Saccade Index', SACCADE_STATS)
+
+
+# Events of the respondents (names), optionally only those in viewpoint vp
+def select_events(events, names, vp=None):
+    selected = events['Resp name'].isin(names).to_numpy()
+    if vp is not None:
+        selected &= events['Viewpoint'].to_numpy() == vp
+    return events[selected]
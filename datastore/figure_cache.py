@@ -0,0 +1,156 @@
+import os
+import glob
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import CACHE_DIR, FIGURE_CACHE_MB, FIGURE_CACHE_DISK_MB
+
+# Cache of built figures (serialized plotly JSON), shared by all sessions
+# Key: figure id + filter hash (filter_key, includes the viewpoint).
+# Two tiers:
+# - memory: LRU, bounded by FIGURE_CACHE_MB
+# - disk: CACHE_DIR/figures/<version>/, survives restarts, bounded by FIGURE_CACHE_DISK_MB
+#   and shared by all server processes: the size is measured on the directory itself
+#   (not counted per process), the oldest figures are removed first
+# The version is a hash of the dataset and of the code that builds the figures,
+# so a new CSV (or changed plots) starts with an empty cache.
+
+FIGURE_DIR = os.path.join(CACHE_DIR, 'figures')
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_DIRS = ['layouts', 'datastore']
+
+
+def code_version():
+    h = hashlib.sha1()
+    paths = sorted(p for d in CODE_DIRS for p in glob.glob(os.path.join(ROOT_DIR, d, '*.py')))
+    for path in paths + [os.path.join(ROOT_DIR, 'config.py')]:     # settings change figures too
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+class FigureCache:
+    def __init__(self, max_bytes, disk_bytes, directory=None):
+        self.max_bytes = max_bytes
+        self.disk_bytes = disk_bytes
+        self.directory = directory
+        self.nbytes = 0
+        self.figures = OrderedDict()    # key -> JSON string, least recently used first
+        self.lock = threading.Lock()
+        if directory is not None:
+            self.open_directory()
+
+    def open_directory(self):
+        # Remove the figures of other dataset/code versions
+        parent = os.path.dirname(self.directory)
+        if os.path.isdir(parent):
+            for old in os.listdir(parent):
+                if os.path.join(parent, old) != self.directory:
+                    shutil.rmtree(os.path.join(parent, old), ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    # Figures on disk (written by any process): [(mtime, size, path)], oldest first
+    def disk_figures(self):
+        figures = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:     # removed by another process
+                    continue
+                figures.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(figures)
+
+    def disk_path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+    def remember(self, key, fig_json):
+        # Memory tier (call with the lock)
+        if key in self.figures:
+            self.nbytes -= len(self.figures.pop(key))
+        self.figures[key] = fig_json
+        self.nbytes += len(fig_json)
+        while self.nbytes > self.max_bytes and len(self.figures) > 1:
+            old_key, old_json = self.figures.popitem(last=False)
+            self.nbytes -= len(old_json)
+
+    def read_disk(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.disk_path(key)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def write_disk(self, key, fig_json):
+        if self.directory is None or len(fig_json) > self.disk_bytes:
+            return
+        path = self.disk_path(key)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(fig_json)
+        os.replace(tmp, path)
+
+        figures = self.disk_figures()
+        nbytes = sum(size for _, size, _ in figures)
+        for _, size, old_path in figures:
+            if nbytes <= self.disk_bytes:
+                break
+            try:
+                os.remove(old_path)
+            except OSError:         # removed by another process
+                pass
+            nbytes -= size
+
+    def get(self, key):
+        with self.lock:
+            if key in self.figures:
+                self.figures.move_to_end(key)
+                return self.figures[key]
+        fig_json = self.read_disk(key)
+        if fig_json is not None:
+            with self.lock:
+                self.remember(key, fig_json)
+        return fig_json
+
+    def put(self, key, fig_json):
+        with self.lock:
+            self.remember(key, fig_json)
+        self.write_disk(key, fig_json)
+
+    # The figure (as dict) with this id, built with build() if it's not cached
+    def figure(self, fig_id, filter_hash, build):
+        if filter_hash is None:
+            return build()
+        key = f'{fig_id}:{filter_hash}'
+        fig_json = self.get(key)
+        if fig_json is None:
+            fig_json = build().to_json()
+            self.put(key, fig_json)
+        return json.loads(fig_json)
+
+
+figure_cache = None
+
+
+# Create the shared cache for a version of the dataset (see datastore/dataset.py)
+def open_figure_cache(dataset_version):
+    global figure_cache
+    version = f'{dataset_version}-{code_version()}'
+    figure_cache = FigureCache(FIGURE_CACHE_MB * 1024 ** 2,
+                               FIGURE_CACHE_DISK_MB * 1024 ** 2,
+                               os.path.join(FIGURE_DIR, version))
+    return figure_cache
+
+
+# Used by the tab functions in the layouts
+def cached_figure(fig_id, filter_hash, build):
+    if figure_cache is None:
+        return build()
+    return figure_cache.figure(fig_id, filter_hash, build)
@@ -0,0 +1,75 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# LRU cache of filtered dfs, keyed by the (normalized) filters in the Store
+# Switching pages with the same filters reuses the filtered df instead of
+# filtering the full df again. The cache is bounded by an estimate of the
+# memory of the cached dfs.
+
+
+def normalize_time(value):
+    time = pd.to_datetime(value, errors='coerce')
+    if type(time) != pd.Timestamp:
+        return None
+    return time.strftime('%H:%M:%S')
+
+
+# Store payload + viewpoint -> canonical hash
+def filter_key(data, vp=None):
+    time = [normalize_time(t) for t in data['time']]
+    if None in time:
+        time = None  # no time filter (see render_page_content)
+    state = {
+        'gender': sorted(set(data['gender'] or [])),
+        'age': sorted(set(int(age) for age in data['age'] or [])),
+        'time': time,
+        'exclude_invalid': bool(data.get('exclude_invalid')),
+        'vp': vp,
+    }
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+
+def frame_size(df):
+    # Shallow size: categories and the index of views are shared, this is an upper-ish estimate
+    return int(df.memory_usage(index=True).sum())
+
+
+class FilterCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.frames = OrderedDict()   # key -> (df, size), least recently used first
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.frames:
+                print(f'Filter cache miss ({key[:8]})')
+                return None
+            self.frames.move_to_end(key)
+            print(f'Filter cache hit ({key[:8]})')
+            return self.frames[key][0]
+
+    def put(self, key, df):
+        size = frame_size(df)
+        if size > self.max_bytes:
+            print(f'Filter cache: not caching {key[:8]}, {size / 1e6:.1f} MB is over the budget')
+            return
+        with self.lock:
+            if key in self.frames:
+                self.nbytes -= self.frames.pop(key)[1]
+            self.frames[key] = (df, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                old_key, (old_df, old_size) = self.frames.popitem(last=False)
+                self.nbytes -= old_size
+                print(f'Filter cache evicted {old_key[:8]} ({old_size / 1e6:.1f} MB)')
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.nbytes = 0
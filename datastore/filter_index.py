@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from datastore.viewpoints import viewpoint_columns
+
+# Bitmap index for the respondent/viewpoint filters in render_page_content
+# The masks are built once at load time (packed, 1 bit per row), so a filter
+# request is a few bitwise AND/ORs plus a searchsorted on the recording time.
+
+
+def seconds_since_midnight(datetimes):
+    # Recording start time of day in seconds, with the fraction (-1 for missing datetimes)
+    dt = pd.Series(datetimes)
+    secs = (dt - dt.dt.normalize()).dt.total_seconds()
+    return secs.fillna(-1).to_numpy(dtype='float64')
+
+
+def time_to_seconds(time):
+    # pd.Timestamp (parsed from the 'HH:MM' filter input) -> seconds since midnight
+    return (time - time.normalize()).total_seconds()
+
+
+class FilterIndex:
+    def __init__(self, df, valid=None):
+        self.n = len(df)
+
+        # One bitmap per gender, age and viewpoint
+        self.gender = self.value_bitmaps(df['Resp gender'])
+        self.age = self.value_bitmaps(df['Resp age'])
+        self.viewpoint = {vp: self.pack(df[col].to_numpy() == 1)
+                          for vp, col in viewpoint_columns(df).items()}
+
+        # Samples that pass the data quality checks (datastore/quality.py), all if not given
+        self.valid = self.pack(np.ones(self.n, dtype=bool) if valid is None else valid)
+
+        # Recording time of day, sorted (with the row numbers) for searchsorted
+        secs = seconds_since_midnight(df['Resp rec datetime'])
+        self.time_order = np.argsort(secs, kind='stable')
+        self.time_sorted = secs[self.time_order]
+
+    def pack(self, mask):
+        return np.packbits(mask)
+
+    def value_bitmaps(self, column):
+        values = column.to_numpy()
+        return {value: self.pack(values == value) for value in pd.unique(values)}
+
+    def empty(self):
+        return np.zeros((self.n + 7) // 8, dtype=np.uint8)
+
+    def any_of(self, bitmaps, values):
+        # OR of the bitmaps of the selected values
+        bitmap = self.empty()
+        for value in values or []:
+            if value in bitmaps:
+                bitmap |= bitmaps[value]
+        return bitmap
+
+    def time_range(self, timebegin, timeend):
+        # Rows whose recording started between timebegin and timeend (pd.Timestamps)
+        lo = np.searchsorted(self.time_sorted, time_to_seconds(timebegin), side='left')
+        hi = np.searchsorted(self.time_sorted, time_to_seconds(timeend), side='right')
+        mask = np.zeros(self.n, dtype=bool)
+        mask[self.time_order[lo:hi]] = True
+        return self.pack(mask)
+
+    # Respondent filters (Store payload) -> packed bitmap
+    def respondents(self, genders, ages, timebegin=None, timeend=None):
+        bitmap = self.any_of(self.gender, genders) & self.any_of(self.age, ages)
+        if timebegin is not None and timeend is not None:
+            bitmap &= self.time_range(timebegin, timeend)
+        return bitmap
+
+    # Restrict a bitmap to the rows where viewpoint vp is active
+    def in_viewpoint(self, bitmap, vp):
+        return bitmap & self.viewpoint.get(vp, self.empty())
+
+    # Restrict a bitmap to the valid samples
+    def only_valid(self, bitmap):
+        return bitmap & self.valid
+
+    # Packed bitmap -> boolean row mask (to index the df with)
+    def mask(self, bitmap):
+        return np.unpackbits(bitmap, count=self.n).astype(bool)
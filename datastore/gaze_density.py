@@ -0,0 +1,46 @@
+import numpy as np
+
+# Gaze/fixation density on the viewpoint panoramas
+# The points are binned server side into a grid over the panorama (cells of
+# DENSITY_CELL_PX pixels, see config.py) and optionally smoothed with a Gaussian,
+# so the plot is one heatmap of constant size, however many respondents are selected.
+
+
+# Gaussian kernel (sigma in cells), cut at 3 sigma or at max_radius
+def gaussian_kernel(sigma, max_radius=None):
+    radius = max(int(3 * sigma), 1)
+    if max_radius is not None:
+        radius = min(radius, max_radius)
+    t = np.arange(-radius, radius + 1)
+    kernel = np.exp(-t ** 2 / (2 * sigma ** 2))
+    return kernel / kernel.sum()
+
+
+# Separable Gaussian blur (sigma in cells)
+# np.convolve(mode='same') returns the longer of its inputs, so the kernel is cut to the
+# size of each axis to keep the shape of the grid
+def smooth(grid, sigma):
+    if not sigma:
+        return grid
+    for axis in range(2):
+        kernel = gaussian_kernel(sigma, (grid.shape[axis] - 1) // 2)
+        grid = np.apply_along_axis(np.convolve, axis, grid, kernel, mode='same')
+    return grid
+
+
+# Points (x, y) -> density grid (rows = y) with the cell centers
+# extent: (x0, x1, y0, y1), shape: (rows, cols)
+def density_grid(x, y, extent, shape, weights=None, sigma=0):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if weights is not None:
+        weights = np.nan_to_num(np.asarray(weights, dtype=float)[valid])
+    x0, x1, y0, y1 = extent
+    grid, y_edges, x_edges = np.histogram2d(y[valid], x[valid], bins=shape,
+                                            range=[[y0, y1], [x0, x1]], weights=weights)
+    grid = smooth(grid, sigma)
+    if grid.max() > 0:
+        grid = grid / grid.max()
+    return grid, (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2
+
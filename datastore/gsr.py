@@ -0,0 +1,191 @@
+import os
+import copy
+import pickle
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from config import GSR_TONIC_WINDOW, GSR_ONSET, GSR_MIN_AMPLITUDE, GSR_CHUNK
+from datastore.detection import runs, run_rows
+
+# GSR processing: tonic & phasic signal and peaks, computed from 'GSR Raw (microSiemens)'
+# (instead of the columns of the export, see GSR_SOURCE in config.py)
+# - tonic: moving average of the raw signal over the last GSR_TONIC_WINDOW seconds
+# - phasic: raw - tonic
+# - peak: maximum of a response (phasic above GSR_ONSET), amplitude = maximum - phasic at the onset
+# GsrStream processes the samples of a respondent chunk by chunk (GSR_CHUNK): it only keeps
+# the last window of samples and the open response, so the memory doesn't grow with the
+# length of the recording.
+# The stream of every respondent is saved after its last sample (state_path, next to the cached
+# signals, see datastore/dataset.py) with the signals so far. When the export changes, a
+# respondent whose earlier samples are unchanged continues from there: only the samples after
+# the last processed one are pushed. Other respondents (and changed settings) start over.
+
+# Bump when the processing below changes, so the cached signals get rebuilt
+GSR_VERSION = 1
+
+GSR_COLS = ['Tonic signal (microSiemens)', 'Phasic signal (microSiemens)',
+            'Peak detected (binary)', 'Peak amplitude (microSiemens)']
+
+
+# Maximum and its (first) position of every run of x
+def run_max(x, starts, stops):
+    if len(starts) == 0:
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    rows, ids, offsets = run_rows(starts, stops)
+    maxes = np.maximum.reduceat(x[rows], offsets)
+    at_max = x[rows] == maxes[ids]
+    first = np.unique(ids[at_max], return_index=True)[1]
+    return maxes, rows[at_max][first]
+
+
+class GsrStream:
+    def __init__(self, window=GSR_TONIC_WINDOW, onset=GSR_ONSET, min_amplitude=GSR_MIN_AMPLITUDE):
+        self.window = window
+        self.onset = onset
+        self.min_amplitude = min_amplitude
+        self.n = 0                              # samples pushed so far
+        self.tail_t = np.empty(0)               # samples of the last window (tonic)
+        self.tail_raw = np.empty(0)
+        self.response = None                    # open response: (onset, max, position of max)
+
+    def tonic(self, t, raw):
+        ts = np.r_[self.tail_t, t]
+        raws = np.r_[self.tail_raw, raw]
+        valid = ~np.isnan(raws)
+        sums = np.r_[0, np.cumsum(np.where(valid, raws, 0))]
+        counts = np.r_[0, np.cumsum(valid)]
+        k = np.arange(len(self.tail_t), len(ts))
+        lo = np.searchsorted(ts, ts[k] - self.window, side='right')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tonic = (sums[k + 1] - sums[lo]) / (counts[k + 1] - counts[lo])
+
+        keep = ts > ts[-1] - self.window
+        self.tail_t, self.tail_raw = ts[keep], raws[keep]
+        return tonic
+
+    # Peaks (sample numbers since the first push, amplitudes) of the responses that ended in phasic
+    def responses(self, phasic):
+        starts, stops = runs(phasic > self.onset)
+        maxes, positions = run_max(phasic, starts, stops)
+        onsets = phasic[starts]
+        positions = positions + self.n
+        peaks, amplitudes = [], []
+
+        # response that was still open at the end of the previous chunk
+        if self.response is not None:
+            onset, peak, position = self.response
+            if len(starts) and starts[0] == 0:
+                if maxes[0] <= peak:
+                    maxes[0], positions[0] = peak, position
+                onsets[0] = onset
+            else:
+                peaks.append(position)
+                amplitudes.append(peak - onset)
+            self.response = None
+
+        # response that continues in the next chunk
+        if len(starts) and stops[-1] == len(phasic):
+            self.response = (onsets[-1], maxes[-1], positions[-1])
+            maxes, positions, onsets = maxes[:-1], positions[:-1], onsets[:-1]
+
+        peaks = np.r_[peaks, positions].astype(np.int64)
+        amplitudes = np.r_[amplitudes, maxes - onsets]
+        large = amplitudes >= self.min_amplitude
+        return peaks[large], amplitudes[large]
+
+    # Next samples (sorted by time) -> tonic, phasic, peaks & amplitudes of the responses that ended
+    def push(self, t, raw):
+        tonic = self.tonic(t, raw)
+        phasic = raw - tonic
+        peaks, amplitudes = self.responses(phasic)
+        self.n += len(t)
+        return tonic, phasic, peaks, amplitudes
+
+    # End of the recording: peak of the open response
+    def close(self):
+        if self.response is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        onset, peak, position = self.response
+        self.response = None
+        if peak - onset < self.min_amplitude:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.array([position]), np.array([peak - onset])
+
+
+# Signals of one respondent (samples sorted by time), continuing from state if it covers their start
+# state: {'stream', 'digest' (of the processed samples), 'tonic', 'phasic', 'peaks', 'amplitudes'}
+def process_respondent(t, raw, chunk=GSR_CHUNK, state=None):
+    n = state['stream'].n if state is not None else 0
+    if state is None or len(t) < n or state['digest'] != samples_digest(t, raw, n):
+        state = {'stream': GsrStream(), 'tonic': np.empty(0, dtype='float32'), 'phasic': np.empty(0, dtype='float32'),
+                 'peaks': np.empty(0, dtype=np.int64), 'amplitudes': np.empty(0)}
+
+    stream = copy.deepcopy(state['stream'])
+    parts = {key: [state[key]] for key in ['tonic', 'phasic', 'peaks', 'amplitudes']}
+    for i in range(stream.n, len(t), chunk):
+        tonic, phasic, peaks, amplitudes = stream.push(t[i:i + chunk], raw[i:i + chunk])
+        parts['tonic'].append(tonic.astype('float32'))
+        parts['phasic'].append(phasic.astype('float32'))
+        parts['peaks'].append(peaks)
+        parts['amplitudes'].append(amplitudes)
+
+    state = {key: np.concatenate(values) for key, values in parts.items()}
+    state['stream'] = stream
+    state['digest'] = samples_digest(t, raw, len(t))
+    return state
+
+
+def samples_digest(t, raw, n):
+    return hashlib.sha1(t[:n].tobytes() + raw[:n].tobytes()).hexdigest()
+
+
+# Saved stream states (respondent -> state), if they were made with the current settings
+def read_state(state_path, settings):
+    try:
+        with open(state_path, 'rb') as f:
+            saved = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return {}
+    return saved['respondents'] if saved.get('settings') == settings else {}
+
+
+def write_state(state_path, settings, states):
+    tmp = state_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump({'settings': settings, 'respondents': states}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, state_path)
+
+
+# GSR_COLS of all respondents (same rows as df)
+# state_path: file with the stream states, to continue from (and save to), None to process everything
+def process_gsr(df, chunk=GSR_CHUNK, state_path=None):
+    t_all = df['Timestamp (s)'].to_numpy(dtype=float)
+    raw_all = df['GSR Raw (microSiemens)'].to_numpy(dtype=float)
+    out = {col: np.full(len(df), np.nan) for col in GSR_COLS}
+    out['Peak detected (binary)'] = np.zeros(len(df), dtype=np.int8)
+
+    settings = (GSR_VERSION, GSR_TONIC_WINDOW, GSR_ONSET, GSR_MIN_AMPLITUDE)
+    saved = read_state(state_path, settings) if state_path else {}
+    states = {}
+
+    for name, rows in df.groupby('Resp name', observed=True).indices.items():
+        rows = rows[np.argsort(t_all[rows], kind='stable')]
+        state = process_respondent(t_all[rows], raw_all[rows], chunk, saved.get(name))
+        states[name] = state
+        out['Tonic signal (microSiemens)'][rows] = state['tonic']
+        out['Phasic signal (microSiemens)'][rows] = state['phasic']
+
+        # the open response ends with the recording (on a copy: appended samples may continue it)
+        close_peaks, close_amplitudes = copy.copy(state['stream']).close()
+        peaks = np.r_[state['peaks'], close_peaks].astype(np.int64)
+        out['Peak detected (binary)'][rows[peaks]] = 1
+        out['Peak amplitude (microSiemens)'][rows[peaks]] = np.r_[state['amplitudes'], close_amplitudes]
+
+    if state_path:
+        write_state(state_path, settings, states)
+
+    gsr = pd.DataFrame(out)
+    gsr[GSR_COLS[:2] + GSR_COLS[3:]] = gsr[GSR_COLS[:2] + GSR_COLS[3:]].astype('float32')
+    return gsr
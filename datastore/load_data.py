@@ -0,0 +1,206 @@
+import os
+import sys
+import glob
+import json
+import hashlib
+
+import pandas as pd
+
+from config import DATA_CSV, CACHE_DIR, ROW_ORDER, DATA_STORE
+from datastore.column_store import write_columns, read_columns
+
+# Loading of the iMotions export (Data_all_respondents.csv)
+# Parsing the full CSV takes minutes, so it is converted once to a typed columnar cache.
+# Next starts read the cache, as long as the CSV hasn't changed (mtime + hash).
+# The df is cached as memory-mapped columns or as one table (DATA_STORE in config.py),
+# the tables derived from it as parquet/pickle.
+
+# Run 'python -m datastore.load_data' to (re)build the cache up front.
+
+# Bump when the schema/preparation below changes, so old caches get rebuilt
+SCHEMA_VERSION = 1
+
+# Declared schema of the prepared df
+TIME_COLS = ['Timestamp', 'Timestamp (s)', 'Relative timestamp (s)']  # stay float64 (precision)
+CATEGORY_COLS = ['Resp name', 'Resp gender']
+DATETIME_COLS = ['Resp rec datetime']
+SMALLINT_COLS = ['Resp age']
+
+
+def is_smallint_col(col):
+    # Binary flags (blinks, peaks, viewpoint active) and validity codes
+    return (col in SMALLINT_COLS
+            or '(binary)' in col
+            or col.startswith('ET_Validity')
+            or all(vpa in col for vpa in ['Viewpoint', 'active']))
+
+
+# Parquet needs pyarrow, without it the cache is a pickle
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+# Format of the cached df
+DF_FORMAT = 'columns' if DATA_STORE == 'columns' else CACHE_FORMAT
+
+
+def apply_schema(df):
+    for col in df.columns:
+        if col in TIME_COLS:
+            continue
+        elif col in CATEGORY_COLS:
+            df[col] = df[col].astype('category')
+        elif col in DATETIME_COLS:
+            df[col] = pd.to_datetime(df[col])
+        elif is_smallint_col(col) and df[col].notna().all():
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif pd.api.types.is_float_dtype(df[col]) or is_smallint_col(col):
+            # sensor columns (and flags with missing values): NaN needs a float
+            df[col] = df[col].astype('float32')
+    return df
+
+
+# Sort keys per row order (see config.ROW_ORDER)
+ROW_ORDERS = {'time': ['Timestamp'],
+              'respondent': ['Resp name', 'Timestamp']}
+
+
+def prepare_df(csv_path, row_order=ROW_ORDER):
+    df = pd.read_csv(csv_path, low_memory=True, index_col='Unnamed: 0')
+    df = df.sort_values(ROW_ORDERS[row_order], kind='mergesort')
+
+    # Df preparation
+    df = df.reset_index(drop=True)
+    return apply_schema(df)
+
+
+def file_hash(path, chunksize=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunksize), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_paths(csv_path, cache_dir, row_order):
+    name = os.path.splitext(os.path.basename(csv_path))[0] + f'.{row_order}'
+    return (os.path.join(cache_dir, f'{name}.{DF_FORMAT}'),
+            os.path.join(cache_dir, f'{name}.meta.json'))
+
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(meta_path, meta):
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+
+
+def cache_is_valid(meta, stat, csv_path, cache_path):
+    if (meta is None or not os.path.exists(cache_path)
+            or meta.get('schema_version') != SCHEMA_VERSION
+            or meta.get('format') != DF_FORMAT
+            or meta.get('size') != stat.st_size):
+        return False
+    if meta.get('mtime') == stat.st_mtime:
+        return True
+    # CSV was touched/copied: only rebuild if the content changed
+    return meta.get('sha256') == file_hash(csv_path)
+
+
+def write_cache(df, cache_path):
+    tmp = cache_path + '.tmp'
+    if CACHE_FORMAT == 'parquet':
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, cache_path)
+
+
+def read_cache(cache_path):
+    if CACHE_FORMAT == 'parquet':
+        return pd.read_parquet(cache_path)
+    return pd.read_pickle(cache_path)
+
+
+def write_df(df, cache_path):
+    if DF_FORMAT == 'columns':
+        write_columns(df, cache_path)
+    else:
+        write_cache(df, cache_path)
+
+
+def read_df(cache_path):
+    if DF_FORMAT == 'columns':
+        return read_columns(cache_path)
+    return read_cache(cache_path)
+
+
+# Identifies the prepared data (for caches of things derived from it)
+def dataset_version(csv_path=DATA_CSV, cache_dir=CACHE_DIR, row_order=ROW_ORDER):
+    meta = read_meta(cache_paths(csv_path, cache_dir, row_order)[1])
+    return f"{meta['sha256'][:16]}-v{SCHEMA_VERSION}-{row_order}"
+
+
+# Tables derived from the df (e.g. the aggregate cube), cached next to it
+# One file per table, for the current version of the data (older versions are removed)
+def derived_path(name, version, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f'{name}.{version}.{CACHE_FORMAT}')
+
+
+def load_derived(name, build, version, cache_dir=CACHE_DIR):
+    path = derived_path(name, version, cache_dir)
+    if os.path.exists(path):
+        print(f'Reading cached {name} ({path})')
+        return read_cache(path)
+
+    print(f'Building {name}...')
+    table = build()
+    for old in glob.glob(derived_path(name, '*', cache_dir)):
+        os.remove(old)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_cache(table, path)
+    return table
+
+
+def load_data(csv_path=DATA_CSV, cache_dir=CACHE_DIR, row_order=ROW_ORDER, rebuild=False):
+    cache_path, meta_path = cache_paths(csv_path, cache_dir, row_order)
+    stat = os.stat(csv_path)
+    meta = read_meta(meta_path)
+
+    if not rebuild and cache_is_valid(meta, stat, csv_path, cache_path):
+        print(f'Reading cached df ({cache_path})')
+        if meta['mtime'] != stat.st_mtime:
+            meta['mtime'] = stat.st_mtime
+            write_meta(meta_path, meta)
+        return read_df(cache_path)
+
+    print(f'Converting {csv_path} to {DF_FORMAT} cache...')
+    df = prepare_df(csv_path, row_order)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_df(df, cache_path)
+    write_meta(meta_path, {'schema_version': SCHEMA_VERSION,
+                           'format': DF_FORMAT,
+                           'mtime': stat.st_mtime,
+                           'size': stat.st_size,
+                           'sha256': file_hash(csv_path)})
+
+    # Map the columns that were just written, instead of keeping the converted df in memory
+    if DF_FORMAT == 'columns':
+        return read_df(cache_path)
+    return df
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATA_CSV
+    df = load_data(csv_path, rebuild=True)
+    print(f'{len(df)} rows, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory')
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from config import METRICS_WINDOW, METRICS_STEP
+from datastore.events import row_viewpoints
+
+# Rolling metrics per respondent: windows of METRICS_WINDOW seconds, every METRICS_STEP seconds
+# - Blink rate (/min): blinks (starts of 'Blink detected') per minute
+# - GSR peaks (/min): detected GSR peaks per minute
+# - Pupil size (mm): mean of the left and right pupil
+# - Head velocity (deg/s): mean angular velocity of the head (gyroscope)
+# One row per window (time = end of the window), so the plots are a few points per
+# respondent and minute instead of all samples. Cached next to the data (see datastore/dataset.py).
+
+# Bump when the metrics below change, so the cached table gets rebuilt
+METRICS_VERSION = 1
+
+METRIC_NAMES = ['Blink rate (/min)', 'GSR peaks (/min)', 'Pupil size (mm)', 'Head velocity (deg/s)']
+
+
+# Mean of the columns per row, ignoring NaN (NaN if all are NaN)
+def row_mean(df, cols):
+    values = df[cols].to_numpy(dtype=float)
+    counts = (~np.isnan(values)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nansum(values, axis=1) / counts
+
+
+# Per sample values that are summed (events) or averaged (signals) per window
+def sample_values(df):
+    return {
+        'blink': df['Blink detected (binary)'].to_numpy() == 1,
+        'peaks': df['Peak detected (binary)'].to_numpy() == 1,
+        'pupil': row_mean(df, ['ET_PupilLeft', 'ET_PupilRight']),
+        'head': np.sqrt(np.sum(df[['ET_GyroX', 'ET_GyroY', 'ET_GyroZ']].to_numpy(dtype=float) ** 2, axis=1)),
+    }
+
+
+# Sums and counts (non-NaN) of values in the windows (ends - window, ends] of the sorted times t
+def window_sums(t, values, ends, window):
+    values = values.astype(float)
+    valid = ~np.isnan(values)
+    sums = np.r_[0, np.cumsum(np.where(valid, values, 0))]
+    counts = np.r_[0, np.cumsum(valid)]
+    hi = np.searchsorted(t, ends, side='right')
+    lo = np.searchsorted(t, ends - window, side='right')
+    return sums[hi] - sums[lo], counts[hi] - counts[lo]
+
+
+def build_metrics(df, window=METRICS_WINDOW, step=METRICS_STEP):
+    t_all = df['Timestamp (s)'].to_numpy(dtype=float)
+    rel_all = df['Relative timestamp (s)'].to_numpy(dtype=float)
+    values = sample_values(df)
+    parts = []
+    for name, rows in df.groupby('Resp name', observed=True).indices.items():
+        rows = rows[np.argsort(t_all[rows], kind='stable')]
+        t = t_all[rows]
+        blink = values['blink'][rows]
+        blinks = blink & ~np.r_[False, blink[:-1]]      # starts of blinks
+        ends = np.arange(t[0] + step, t[-1] + step, step)
+        last = rows[np.searchsorted(t, ends, side='right') - 1]    # last sample of each window
+        minutes = np.minimum(window, ends - t[0]) / 60
+
+        blinks, samples = window_sums(t, blinks, ends, window)
+        peaks, _ = window_sums(t, values['peaks'][rows], ends, window)
+        pupil, pupil_count = window_sums(t, values['pupil'][rows], ends, window)
+        head, head_count = window_sums(t, values['head'][rows], ends, window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            part = pd.DataFrame({
+                'Timestamp (s)': ends,
+                'Relative timestamp (s)': rel_all[last] + (ends - t_all[last]),
+                'Viewpoint': row_viewpoints(df, last),
+                'Blink rate (/min)': np.where(samples > 0, blinks / minutes, np.nan),
+                'GSR peaks (/min)': np.where(samples > 0, peaks / minutes, np.nan),
+                'Pupil size (mm)': pupil / pupil_count,
+                'Head velocity (deg/s)': head / head_count})
+        part.insert(0, 'Resp name', name)
+        parts.append(part)
+
+    metrics = pd.concat(parts, ignore_index=True)
+    metrics['Resp name'] = metrics['Resp name'].astype('category')
+    metrics[METRIC_NAMES] = metrics[METRIC_NAMES].astype('float32')
+    return metrics
+
+
+# Windows of the respondents (names), optionally only those that end in viewpoint vp
+def select_metrics(metrics, names, vp=None):
+    selected = metrics['Resp name'].isin(names).to_numpy()
+    if vp is not None:
+        selected &= metrics['Viewpoint'].to_numpy() == vp
+    return metrics[selected]
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from config import PYRAMID_FACTOR, ZOOM_POINT_BUDGET
+
+# Multi-resolution min/max pyramids of time series (per respondent and signal)
+# Level k keeps the index of the min and the max of every bucket of
+# PYRAMID_FACTOR ** (k + 1) samples. A query for a time range picks the finest
+# level that fits in the point budget, so every zoom costs a bounded number of
+# points, however long the recording is.
+# keep (a mask over the rows of the df) restricts a query to some rows, e.g. the valid
+# samples or a brushed time window. If the kept rows of the range are contiguous the range
+# shrinks to them and the pyramid answers (the partial buckets at its edges from the samples);
+# otherwise the pyramid's extremes may be rows that aren't kept, so the min/max per bucket is
+# taken over the kept rows of the range instead.
+
+SIGNALS = ['GSR Raw (microSiemens)', 'Tonic signal (microSiemens)', 'Phasic signal (microSiemens)',
+           'Peak detected (binary)', 'Peak amplitude (microSiemens)',
+           'ET_GyroX', 'ET_GyroY', 'ET_GyroZ', 'ET_AccX', 'ET_AccY', 'ET_AccZ']
+
+
+def reduce_buckets(idx, values, factor, pick):
+    # pick (np.argmin/np.argmax) per bucket of `factor` candidates
+    m = len(idx)
+    size = -(-m // factor) * factor
+    fill = np.inf if pick is np.argmin else -np.inf
+    padded = np.full(size, fill)
+    padded[:m] = values[idx]
+    padded_idx = np.r_[idx, np.full(size - m, idx[-1])]
+    best = pick(padded.reshape(-1, factor), axis=1) + np.arange(0, size, factor)
+    return padded_idx[best]
+
+
+class Pyramid:
+    def __init__(self, y, factor=PYRAMID_FACTOR):
+        self.n = len(y)
+        self.factor = factor
+        lows = np.where(np.isnan(y), np.inf, y)
+        highs = np.where(np.isnan(y), -np.inf, y)
+
+        # levels[k] = (min indices, max indices), bucket size factor ** (k + 1)
+        self.levels = []
+        idx_min = idx_max = np.arange(self.n, dtype=np.int32)
+        while len(idx_min) > 1:
+            idx_min = reduce_buckets(idx_min, lows, factor, np.argmin)
+            idx_max = reduce_buckets(idx_max, highs, factor, np.argmax)
+            self.levels.append((idx_min, idx_max))
+
+    # Level that represents samples i0:i1 with at most ~budget points (None: all samples fit)
+    def level(self, i0, i1, budget=ZOOM_POINT_BUDGET):
+        if i1 - i0 <= budget:
+            return None
+        for k in range(len(self.levels)):
+            size = self.factor ** (k + 1)
+            b0, b1 = i0 // size, -(-i1 // size)
+            if 2 * (b1 - b0) <= budget or k == len(self.levels) - 1:
+                return k
+
+    # Sample indices (sorted) that represent samples i0:i1 with at most ~budget points
+    def query(self, i0, i1, budget=ZOOM_POINT_BUDGET):
+        k = self.level(i0, i1, budget)
+        if k is None:
+            return np.arange(i0, i1)
+        size = self.factor ** (k + 1)
+        idx_min, idx_max = self.levels[k]
+        b0, b1 = i0 // size, -(-i1 // size)
+        return np.unique(np.r_[idx_min[b0:b1], idx_max[b0:b1]])
+
+
+# Rows of the min and the max of every bucket of rows, at most ~budget rows (rows sorted)
+def bucket_extremes(rows, y, budget):
+    if len(rows) <= budget:
+        return rows
+    pos = np.arange(len(rows))
+    factor = -(-2 * len(rows) // budget)
+    lows = reduce_buckets(pos, np.where(np.isnan(y), np.inf, y), factor, np.argmin)
+    highs = reduce_buckets(pos, np.where(np.isnan(y), -np.inf, y), factor, np.argmax)
+    return rows[np.unique(np.r_[lows, highs])]
+
+
+class TimeSeriesPyramids:
+    def __init__(self, df, x, signals, group='Resp name'):
+        self.x = x
+        self.group = group
+        self.n = len(df)
+
+        # respondent -> row numbers (sorted by time) and their x values
+        self.rows = df.groupby(group, observed=True).indices
+        xs = df[x].to_numpy()
+        self.xs = {name: xs[rows] for name, rows in self.rows.items()}
+
+        self.pyramids = {}
+        self.values = {x: xs}
+        for signal in signals:
+            if signal not in df.columns:
+                continue
+            self.values[signal] = df[signal].to_numpy()
+            ys = self.values[signal].astype(float)
+            for name, rows in self.rows.items():
+                self.pyramids[(name, signal)] = Pyramid(ys[rows])
+
+    # Rows (global row numbers) of a respondent's signal within x_range (only the rows in keep)
+    def query(self, name, signal, x_range=None, budget=ZOOM_POINT_BUDGET, keep=None):
+        xs = self.xs[name]
+        if x_range is None:
+            i0, i1 = 0, len(xs)
+        else:
+            i0 = np.searchsorted(xs, x_range[0], side='left')
+            i1 = np.searchsorted(xs, x_range[1], side='right')
+        if keep is None:
+            return self.rows[name][self.pyramids[(name, signal)].query(i0, i1, budget)]
+
+        kept = i0 + np.flatnonzero(keep[self.rows[name][i0:i1]])
+        if len(kept) == 0:
+            return np.empty(0, dtype=np.int64)
+        rows = self.rows[name]
+        y = self.values[signal]
+        pyramid = self.pyramids[(name, signal)]
+        i0, i1 = kept[0], kept[-1] + 1
+        k = pyramid.level(i0, i1, budget) if i1 - i0 == len(kept) else None
+        if k is None:
+            # Scattered kept rows (or few enough to plot all): min/max per bucket of the kept samples
+            return bucket_extremes(rows[kept], y[rows[kept]].astype(float), budget)
+
+        # Contiguous kept rows: the whole buckets from the pyramid, the partial buckets at the
+        # edges (which reach outside the kept rows) from the samples
+        size = pyramid.factor ** (k + 1)
+        b0, b1 = -(-i0 // size), i1 // size
+        idx_min, idx_max = pyramid.levels[k]
+        edges = [np.arange(i0, min(b0 * size, i1)), np.arange(max(b1 * size, i0), i1)]
+        picked = [idx_min[b0:b1], idx_max[b0:b1]]
+        picked += [bucket_extremes(edge, y[rows[edge]].astype(float), 2) for edge in edges if len(edge)]
+        return rows[np.unique(np.concatenate(picked))]
+
+    # df (group, x, signal) of the respondents, ready to plot
+    def frame(self, names, signal, x_range=None, budget=ZOOM_POINT_BUDGET, keep=None):
+        parts = []
+        for name in names:
+            if (name, signal) not in self.pyramids:
+                continue
+            rows = self.query(name, signal, x_range, budget, keep)
+            parts.append(pd.DataFrame({self.group: name,
+                                       self.x: self.values[self.x][rows],
+                                       signal: self.values[signal][rows]}))
+        if len(parts) == 0:
+            return pd.DataFrame(columns=[self.group, self.x, signal])
+        return pd.concat(parts, ignore_index=True).dropna(subset=[signal])
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from config import QUALITY_MAX_DISTANCE, QUALITY_PUPIL_OUTLIERS, QUALITY_INVALID_VALIDITY
+from datastore.viewpoints import viewpoint_columns
+from datastore.detection import runs
+
+# Data quality: invalid samples and a scorecard per respondent (and viewpoint)
+# The masks are computed once at load time. FilterIndex keeps the valid samples
+# as a bitmap, for the 'exclude invalid samples' filter.
+
+# Bump when the checks/scorecard below change, so the cached scorecard gets rebuilt
+QUALITY_VERSION = 1
+
+# check -> invalid samples (NaN is not invalid: no measurement)
+QUALITY_CHECKS = {
+    'Distance': lambda df: df['ET_DistanceLeft'].to_numpy() > QUALITY_MAX_DISTANCE,
+    'Pupil': lambda df: ((df['ET_PupilLeft'].to_numpy() >= QUALITY_PUPIL_OUTLIERS[0])
+                         & (df['ET_PupilLeft'].to_numpy() <= QUALITY_PUPIL_OUTLIERS[1])),
+    'Validity': lambda df: df['ET_ValidityLeftEye'].to_numpy() >= QUALITY_INVALID_VALIDITY,
+}
+
+# Columns of the scorecard (besides Resp name & Viewpoint)
+SCORECARD_NAMES = (['Samples', 'Valid (%)'] + [f'{check} (%)' for check in QUALITY_CHECKS]
+                   + ['Invalid intervals', 'Longest invalid (s)', 'Mean invalid (s)'])
+
+
+# check -> mask of invalid samples, 'Invalid' = invalid for any check
+def invalid_masks(df):
+    masks = {check: invalid(df) for check, invalid in QUALITY_CHECKS.items()}
+    masks['Invalid'] = np.logical_or.reduce(list(masks.values()))
+    return masks
+
+
+# Scorecard of samples (rows, sorted by time)
+def score(rows, t, masks):
+    invalid = masks['Invalid'][rows]
+    starts, stops = runs(invalid)
+    durations = t[rows][stops - 1] - t[rows][starts]
+    card = {'Samples': len(rows), 'Valid (%)': 100 * (1 - invalid.mean())}
+    for check in QUALITY_CHECKS:
+        card[f'{check} (%)'] = 100 * masks[check][rows].mean()
+    card['Invalid intervals'] = len(starts)
+    card['Longest invalid (s)'] = durations.max() if len(starts) else 0.0
+    card['Mean invalid (s)'] = durations.mean() if len(starts) else 0.0
+    return card
+
+
+# One row per respondent and viewpoint (Viewpoint 0 = full route)
+def build_scorecard(df, masks):
+    t = df['Timestamp (s)'].to_numpy(dtype=float)
+    active = {vp: df[col].to_numpy() == 1 for vp, col in viewpoint_columns(df).items()}
+    cards = []
+    for name, rows in df.groupby('Resp name', observed=True).indices.items():
+        rows = rows[np.argsort(t[rows], kind='stable')]
+        cards.append({'Resp name': name, 'Viewpoint': 0, **score(rows, t, masks)})
+        for vp, mask in active.items():
+            vp_rows = rows[mask[rows]]
+            if len(vp_rows):
+                cards.append({'Resp name': name, 'Viewpoint': vp, **score(vp_rows, t, masks)})
+
+    scorecard = pd.DataFrame(cards)
+    scorecard['Resp name'] = scorecard['Resp name'].astype('category')
+    return scorecard
+
+
+# Scorecard rows of the respondents (names) for viewpoint vp (None = full route)
+def select_scorecard(scorecard, names, vp=None):
+    selected = scorecard['Resp name'].isin(names) & (scorecard['Viewpoint'] == (vp or 0))
+    return scorecard[selected.to_numpy()]
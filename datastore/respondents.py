@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from datastore.filter_index import seconds_since_midnight, time_to_seconds
+
+# Respondent dimension table: one row per respondent (index 'Resp name'), built at load time
+# - Resp gender, Resp age, Resp rec datetime (recording start)
+# - First row, End row: range of the respondent's rows in the df (contiguous when
+#   ROW_ORDER = 'respondent', otherwise interleaved with the other respondents)
+# - Samples: number of rows
+# Respondent-level plots and filters use this table instead of scanning the rows.
+
+RESPONDENT_COLS = ['Resp gender', 'Resp age', 'Resp rec datetime']
+
+
+def respondent_table(df):
+    rows = pd.DataFrame({'Resp name': df['Resp name'].to_numpy(), 'Row': np.arange(len(df))})
+    ranges = rows.groupby('Resp name', observed=True)['Row'].agg(['min', 'max', 'count'])
+    table = df.groupby('Resp name', observed=True)[RESPONDENT_COLS].first()
+    table['First row'] = ranges['min']
+    table['End row'] = ranges['max'] + 1
+    table['Samples'] = ranges['count']
+
+    # in order of appearance in the df
+    return table.sort_values('First row')
+
+
+# Respondents that match the filters (same rules as FilterIndex.respondents)
+def select_respondents(table, genders, ages, timebegin=None, timeend=None):
+    selected = table['Resp gender'].isin(genders or []) & table['Resp age'].isin(ages or [])
+    if timebegin is not None and timeend is not None:
+        secs = seconds_since_midnight(table['Resp rec datetime'])
+        selected &= (secs >= time_to_seconds(timebegin)) & (secs <= time_to_seconds(timeend))
+    return table[selected.to_numpy()]
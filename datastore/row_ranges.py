@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+# Row-range index for a df stored with ROW_ORDER = 'respondent'
+# Every respondent is one contiguous block of rows, so selecting respondents
+# (and their viewpoint segments) takes the rows of a few ranges instead of a
+# boolean mask over all rows. A single range (one respondent, or one visit to a
+# viewpoint) is a slice of the df without copying, more ranges are copied.
+
+
+class RowRanges:
+    def __init__(self, df, segments):
+        codes, names = pd.factorize(df['Resp name'])
+        change = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.r_[0, change]
+        stops = np.r_[change, len(df)]
+        if len(starts) != len(names):
+            raise ValueError('Rows are not grouped by respondent (use ROW_ORDER = "respondent")')
+
+        # respondent -> (start, stop)
+        self.respondent = {names[codes[start]]: (int(start), int(stop))
+                           for start, stop in zip(starts, stops)}
+
+        # (respondent, viewpoint) -> [(start, stop), ...]: the viewpoint segments (datastore/segments.py),
+        # whose rows are the df rows in this order
+        self.viewpoint = {}
+        for name, vp, start, stop in zip(segments['Resp name'], segments['Viewpoint'],
+                                         segments['Start row'], segments['End row']):
+            self.viewpoint.setdefault((name, int(vp)), []).append((int(start), int(stop)))
+
+    def ranges(self, names, vp=None):
+        if vp is None:
+            ranges = [self.respondent[name] for name in names if name in self.respondent]
+        else:
+            ranges = [r for name in names for r in self.viewpoint.get((name, vp), [])]
+        return sorted(ranges)
+
+    # Rows of the respondents (optionally only where viewpoint vp is active)
+    def take(self, df, names, vp=None):
+        ranges = self.ranges(names, vp)
+        if len(ranges) == 0:
+            return df.iloc[0:0]
+        if len(ranges) == 1:
+            return df.iloc[ranges[0][0]:ranges[0][1]]
+        return df.take(np.concatenate([np.arange(start, stop) for start, stop in ranges]))
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from datastore.viewpoints import viewpoint_columns
+from datastore.detection import runs
+from datastore.time_index import respondent_order, respondent_bounds
+
+# Viewpoint segments: one row per visit of a respondent to a viewpoint (run of samples
+# where the viewpoint is active, in order of time)
+# Columns: Resp name, Viewpoint, Start row, End row (exclusive), Start (s), End (s) (Timestamp (s)),
+# Samples and Dwell time (s). The rows are positions in the rows grouped by respondent and
+# sorted by time (datastore/time_index.py), which are the df rows for ROW_ORDER = 'respondent'.
+# So the rows of a viewpoint are a few slices, and the route of a respondent is a few rows.
+# Built once per version of the data and cached next to it (see datastore/dataset.py).
+
+# Bump when the table below changes, so the cached table gets rebuilt
+SEGMENTS_VERSION = 1
+
+SEGMENT_COLS = ['Resp name', 'Viewpoint', 'Start row', 'End row', 'Start (s)', 'End (s)', 'Samples', 'Dwell time (s)']
+
+
+def build_segments(df):
+    codes, names, order = respondent_order(df)
+    bounds = respondent_bounds(codes, names)
+    rows = np.arange(len(df)) if order is None else order
+    t = df['Timestamp (s)'].to_numpy(dtype=float)[rows]
+
+    parts = []
+    for vp, col in viewpoint_columns(df).items():
+        active = df[col].to_numpy()[rows] == 1
+        for name, (start, stop) in bounds.items():
+            starts, stops = runs(active[start:stop])
+            if len(starts) == 0:
+                continue
+            parts.append(pd.DataFrame({'Resp name': name, 'Viewpoint': vp,
+                                       'Start row': start + starts, 'End row': start + stops,
+                                       'Start (s)': t[start + starts], 'End (s)': t[start + stops - 1]}))
+
+    if not parts:
+        return pd.DataFrame(columns=SEGMENT_COLS)
+    segments = pd.concat(parts, ignore_index=True).sort_values(['Resp name', 'Start (s)'], kind='mergesort')
+    segments['Samples'] = segments['End row'] - segments['Start row']
+    segments['Dwell time (s)'] = segments['End (s)'] - segments['Start (s)']
+    segments['Resp name'] = segments['Resp name'].astype('category')
+    segments['Viewpoint'] = segments['Viewpoint'].astype(np.int8)
+    return segments.reset_index(drop=True)[SEGMENT_COLS]
+
+
+# Segments of the respondents (names), optionally only of viewpoint vp
+def select_segments(segments, names, vp=None):
+    selected = segments['Resp name'].isin(names).to_numpy()
+    if vp is not None:
+        selected &= segments['Viewpoint'].to_numpy() == vp
+    return segments[selected]
+
+
+# df rows of segments, in order of time per respondent
+# order: the sorted rows the segments refer to (TimeIndex.rows['Timestamp (s)'], None = the df order)
+def segment_rows(segments, order=None):
+    slices = [np.arange(start, stop) if order is None else order[start:stop]
+              for start, stop in zip(segments['Start row'], segments['End row'])]
+    return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+
+# Dwell time (s) and visits per respondent & viewpoint
+def dwell_times(segments):
+    return segments.groupby(['Resp name', 'Viewpoint'], observed=True).agg(
+        **{'Dwell time (s)': ('Dwell time (s)', 'sum'), 'Visits': ('Samples', 'size')}).reset_index()
@@ -0,0 +1,95 @@
+import numpy as np
+
+from config import SPATIAL_GRID_CELLS
+from datastore.viewpoints import viewpoint_columns
+from datastore.aoi import points_in_polygon
+
+# Spatial index for box/lasso selections on the gaze & fixation plots of the viewpoints
+# The points (x, y) of a viewpoint are sorted by the cell of a uniform grid they are in,
+# so the cells of one grid row are one contiguous slice. A selection only tests the
+# points in the rows/columns of cells that overlap its bounding box, and returns their
+# row numbers in the df (built once at load time, see datastore/dataset.py).
+
+
+class GridIndex:
+    def __init__(self, x, y, rows, cells=SPATIAL_GRID_CELLS):
+        valid = ~(np.isnan(x) | np.isnan(y))
+        x, y, rows = x[valid], y[valid], rows[valid]
+        self.cells = cells
+        if len(x):
+            self.extent = x.min(), x.max(), y.min(), y.max()
+        else:
+            self.extent = 0, 0, 0, 0
+
+        cx, cy = self.cell_xy(x, y)
+        cell = cy * cells + cx
+        order = np.argsort(cell, kind='stable')
+        self.x = x[order].astype(np.float32)
+        self.y = y[order].astype(np.float32)
+        self.rows = rows[order]
+        # cell -> start of its points (offsets[cell]:offsets[cell + 1])
+        self.offsets = np.searchsorted(cell[order], np.arange(cells * cells + 1))
+
+    # Column and row of the cells of the points (clipped to the grid)
+    def cell_xy(self, x, y):
+        x0, x1, y0, y1 = self.extent
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cx = (np.asarray(x, dtype=float) - x0) / (x1 - x0) * self.cells
+            cy = (np.asarray(y, dtype=float) - y0) / (y1 - y0) * self.cells
+        return (np.clip(np.nan_to_num(cx), 0, self.cells - 1).astype(np.int64),
+                np.clip(np.nan_to_num(cy), 0, self.cells - 1).astype(np.int64))
+
+    # Positions (in the sorted points) of the points in the cells overlapping the box
+    def candidates(self, x0, x1, y0, y1):
+        e = self.extent
+        if x1 < e[0] or x0 > e[1] or y1 < e[2] or y0 > e[3]:
+            return np.empty(0, dtype=np.int64)
+        (cx0, cx1), (cy0, cy1) = self.cell_xy([x0, x1], [y0, y1])
+        starts = self.offsets[np.arange(cy0, cy1 + 1) * self.cells + cx0]
+        stops = self.offsets[np.arange(cy0, cy1 + 1) * self.cells + cx1 + 1]
+        return np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+
+    # Rows of the points in the box [x0, x1] x [y0, y1]
+    def box(self, x0, x1, y0, y1):
+        x0, x1, y0, y1 = min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1)
+        points = self.candidates(x0, x1, y0, y1)
+        x, y = self.x[points], self.y[points]
+        inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        return np.sort(self.rows[points[inside]])
+
+    # Rows of the points in the polygon [[x, y], ...]
+    def lasso(self, polygon):
+        polygon = np.asarray(polygon, dtype=float)
+        points = self.candidates(polygon[:, 0].min(), polygon[:, 0].max(), polygon[:, 1].min(), polygon[:, 1].max())
+        inside = points_in_polygon(self.x[points], self.y[points], polygon)
+        return np.sort(self.rows[points[inside]])
+
+
+# {viewpoint: GridIndex} over the points (x_col, y_col) of the rows where the viewpoint is active
+def viewpoint_indexes(df, x_col, y_col):
+    x_all = df[x_col].to_numpy(dtype=float)
+    y_all = df[y_col].to_numpy(dtype=float)
+    indexes = {}
+    for vp, col in viewpoint_columns(df).items():
+        rows = np.flatnonzero(df[col].to_numpy() == 1)
+        indexes[vp] = GridIndex(x_all[rows], y_all[rows], rows)
+    return indexes
+
+
+# selectedData of a plot -> selection ({'box': [x0, x1, y0, y1]} or {'lasso': [[x, y], ...]}), None if nothing
+def selection_geometry(selected):
+    if not selected:
+        return None
+    if 'range' in selected and 'x' in selected['range']:
+        (x0, x1), (y0, y1) = selected['range']['x'], selected['range']['y']
+        return {'box': [x0, x1, y0, y1]}
+    if 'lassoPoints' in selected and 'x' in selected['lassoPoints']:
+        return {'lasso': [list(point) for point in zip(selected['lassoPoints']['x'], selected['lassoPoints']['y'])]}
+    return None
+
+
+# Rows of the points in a selection
+def select_rows(index, selection):
+    if 'box' in selection:
+        return index.box(*selection['box'])
+    return index.lasso(selection['lasso'])
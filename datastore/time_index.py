@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# Sorted timestamp index per respondent, for time windows brushed on the time graphs
+# For every time column the rows are grouped by respondent and sorted by time, so the
+# rows of a respondent in a window are found with two binary searches and are a slice
+# of the index (no copy). If the df is already stored in that order (ROW_ORDER =
+# 'respondent' and 'Timestamp (s)'), the slice is a range of df rows.
+
+TIME_COLUMNS = ['Timestamp (s)', 'Relative timestamp (s)']
+
+
+# Are the rows grouped by respondent (codes in order of appearance) and sorted by t
+def is_sorted(codes, t):
+    dc, dt = np.diff(codes), np.diff(t)
+    return bool(np.all(dc >= 0) and np.all((dc > 0) | (dt >= 0)))
+
+
+# Rows grouped by respondent and sorted by column: respondent codes, names and the order
+# of the rows (None if the df is already in that order)
+def respondent_order(df, column='Timestamp (s)'):
+    codes, names = pd.factorize(df['Resp name'])
+    t = df[column].to_numpy(dtype=float)
+    return codes, names, None if is_sorted(codes, t) else np.lexsort((t, codes))
+
+
+# respondent -> (start, stop) of its rows in the order of respondent_order
+def respondent_bounds(codes, names):
+    bounds = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(names)))]
+    return {name: (int(bounds[i]), int(bounds[i + 1])) for i, name in enumerate(names)}
+
+
+class TimeIndex:
+    def __init__(self, df, columns=TIME_COLUMNS):
+        # column -> sorted rows (None: the df order) and their times
+        self.rows, self.times = {}, {}
+        for column in columns:
+            codes, names, order = respondent_order(df, column)
+            t = df[column].to_numpy(dtype=float)
+            self.rows[column], self.times[column] = order, t if order is None else t[order]
+        self.respondent = respondent_bounds(codes, names)
+
+    # Rows of the respondent with t0 <= column <= t1 (slice of df rows or array view)
+    def rows_in(self, name, column, t0, t1):
+        start, stop = self.respondent[name]
+        times = self.times[column][start:stop]
+        lo = start + int(np.searchsorted(times, t0, side='left'))
+        hi = start + int(np.searchsorted(times, t1, side='right'))
+        rows = self.rows[column]
+        return slice(lo, hi) if rows is None else rows[lo:hi]
+
+    # Row mask (over the full df) of the respondents (names) in the window
+    def window_mask(self, n, names, column, t0, t1):
+        selected = np.zeros(n, dtype=bool)
+        for name in names:
+            if name in self.respondent:
+                selected[self.rows_in(name, column, t0, t1)] = True
+        return selected
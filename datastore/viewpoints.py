@@ -0,0 +1,45 @@
+import os
+import hashlib
+
+# The viewpoints of the route, defined once:
+# - column: the 'active' column of the viewpoint in the data
+# - image: panorama in assets/ (served by Dash as a static, cacheable file)
+# - width/height: size of the panorama, scale: size of the plots on the panorama
+# The images are hashed at startup, the hash is added to their URL so browsers
+# can cache them until the file changes.
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+
+
+class Viewpoint:
+    def __init__(self, number, image, width, height, scale):
+        self.number = number
+        self.column = f'Viewpoint_{number} active on Tobii Glasses 2 Scene'
+        self.image = image
+        self.width = width * scale
+        self.height = height * scale
+        self.version = image_version(image)
+
+
+# Hash of an image in assets/ (None if it's missing)
+def image_version(image):
+    try:
+        with open(os.path.join(ASSETS_DIR, image), 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()[:12]
+    except OSError:
+        print(f'Viewpoint image {image} not found in {ASSETS_DIR}')
+        return None
+
+
+VIEWPOINTS = {vp.number: vp for vp in [
+    Viewpoint(1, 'img/Viewport_Panorama-1.jpg', 709, 400, 1.2),
+    Viewpoint(2, 'img/Viewport_Panorama-2.jpg', 513, 394, 1.2),
+    Viewpoint(3, 'img/Viewport_Panorama-3.jpg', 425, 356, 1.3),
+    Viewpoint(4, 'img/Viewport_Panorama-4.jpg', 456, 314, 1.4),
+    Viewpoint(5, 'img/Viewport_Panorama-5.jpg', 558, 226, 1.4),
+]}
+
+
+# {viewpoint: 'active' column} of the viewpoints in df
+def viewpoint_columns(df):
+    return {number: vp.column for number, vp in VIEWPOINTS.items() if vp.column in df.columns}
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from datastore.cube import cube_totals
+
+# Statistics per viewpoint (the table on the home page), for any subset of the respondents
+# Computed from the aggregate cube (datastore/cube.py), so the cost depends on the
+# number of respondents and viewpoints, not on the number of samples.
+
+# Columns of the table, in order
+STATS_NAMES = ['Blinkrate', 'GSR peaks', 'GSR raw',
+               'Fixations amount', 'Fixations duration', 'Fixations dispersion',
+               'Saccades amount', 'Saccades duration', 'Saccades amplitude']
+
+
+# cube -> DataFrame with the STATS_NAMES per viewpoint (index), for the viewpoints with data
+# names: the respondents (default: all), amounts (GSR peaks, fixations, saccades) are per respondent
+def viewpoint_stats(cube, names=None):
+    amt_resp = len(names) if names is not None else cube['Resp name'].nunique()
+    totals = cube_totals(cube, names)
+    totals = totals[totals['samples'] > 0]
+    if len(totals) == 0 or amt_resp == 0:
+        return pd.DataFrame(columns=STATS_NAMES)
+
+    stats = pd.DataFrame({
+        'Blinkrate': (totals['blink_sum'] / totals['blink_count']).round(4),
+        'GSR peaks': (totals['peaks'] / amt_resp).round(0),
+        'GSR raw': (totals['gsr_sum'] / totals['gsr_count']).round(2),
+        'Fixations amount': (totals['fixations'] / amt_resp).round(0),
+        'Fixations duration': (totals['fix_dur_sum'] / totals['fix_dur_count']).round(2),
+        'Fixations dispersion': (totals['fix_dis_sum'] / totals['fix_dis_count']).round(4),
+        'Saccades amount': (totals['saccades'] / amt_resp).round(0),
+        'Saccades duration': (totals['sac_dur_sum'] / totals['sac_dur_count']).round(2),
+        'Saccades amplitude': (totals['sac_amp_sum'] / totals['sac_amp_count']).round(4)})
+    return stats
@@ -0,0 +1,18 @@
+import os
+
+from config import SERVER_BIND, SERVER_WORKERS, SERVER_THREADS, SERVER_TIMEOUT
+
+# gunicorn settings of the production server (see wsgi.py and the SERVER_* settings in config.py)
+
+bind = SERVER_BIND
+workers = SERVER_WORKERS or os.cpu_count()
+threads = SERVER_THREADS
+worker_class = 'gthread'
+timeout = SERVER_TIMEOUT
+
+# Load the dataset once in the master process, the forked workers share it
+preload_app = True
+
+
+def post_fork(server, worker):
+    print(f'Worker {worker.pid} started')
@@ -1,3 +1,4 @@
+import numpy as np
 from numpy import diff
 import pandas as pd
 import dash_bootstrap_components as dbc
@@ -10,6 +11,13 @@ from plotly.subplots import make_subplots
 import base64
 
 from app import app
+from datastore.figure_cache import cached_figure
+from datastore.dataset import pyramids
+from datastore.segments import dwell_times
+from layouts.render_policy import render_mode, scatter_trace
+from layouts.scorecard_table import scorecard_table
+from layouts.time_brush import time_graph, time_window_bar
+from config import METRICS_WINDOW, QUALITY_MAX_DISTANCE, QUALITY_PUPIL_OUTLIERS, QUALITY_INVALID_VALIDITY
 
 # Layout of the page: DATA FULL ROUTE
 # The functions in this file generate the HTML elements with updated plots
@@ -21,46 +29,177 @@ from app import app
 # - Tab 4: Data quality
 # - layout_home combines all the tabs into 1 page layout
 
+# Route of the respondents: timeline of the viewpoint visits and dwell time per viewpoint
+# segments: the viewpoint segments of the respondents (datastore/segments.py), a few rows per respondent
+def route_section(segments):
+    fig_timeline = go.Figure()
+    for vp, visits in segments.groupby('Viewpoint'):
+        fig_timeline.add_trace(go.Bar(y=visits['Resp name'].astype(str), x=visits['Dwell time (s)'],
+                                      base=visits['Start (s)'], orientation='h', name=f'Viewpoint {vp}',
+                                      hovertemplate='%{y}: %{base:.0f} - %{x:.0f} s<extra></extra>'))
+    fig_timeline.update_layout(title='Viewpoints over time', barmode='overlay',
+                               xaxis_title='Timestamp (s)', yaxis_title='Respondent')
+
+    dwell = dwell_times(segments)
+    fig_dwell = px.bar(dwell.assign(Viewpoint=dwell['Viewpoint'].astype(str)),
+                       x='Resp name',
+                       y='Dwell time (s)',
+                       color='Viewpoint',
+                       barmode='group',
+                       hover_data=['Visits'],
+                       title='Dwell time per viewpoint')
+
+    return html.Section(
+        className='mb-5',
+        children=
+        [
+            html.H4('Route'),
+            html.P('When the respondents were at the viewpoints (x-axis: time, y-axis: respondent), and their total time per viewpoint.'),
+            dbc.Row(
+                children=
+                [
+                    dbc.Col(
+                        width=6,
+                        children=
+                        [
+                            dcc.Graph(figure=fig_timeline)
+                        ]
+                    ),
+                    dbc.Col(
+                        width=6,
+                        children=
+                        [
+                            dcc.Graph(figure=fig_dwell)
+                        ]
+                    ),
+                ]
+            ),
+        ]
+    )
+
+
 # Combined layout:
-def layout_fullroute(df):
+# The tabs are empty here, the content of the chosen tab is rendered by the
+# 'tabs-nav' callback (callbacks/render_tabs.py) with render_tab()
+def layout_fullroute(segments):
     layout = html.Div([
+        route_section(segments),
+        dcc.Store(id='tabs-rendered', data=[]),     # tabs that already have their content
+        time_window_bar(),                          # brushed time window
+        dcc.Store(id='gaze-selection', data=None),  # box/lasso selection (only on the viewpoint pages)
         dcc.Tabs(
             id='tabs-nav',
             value='tab-eyetracker',
             className='mb-5',
             children=
             [
-                dcc.Tab(label='Eyetracker', value='tab-eyetracker', children=tab_eyes(df)),
-                dcc.Tab(label='GSR', value='tab-gsr', children=tab_gsr(df)),
-                dcc.Tab(label='Head movement', value='tab-movement', children=tab_movement(df)),
-                dcc.Tab(label='Data quality', value='tab-quality', children=tab_quality(df)),
+                dcc.Tab(label='Eyetracker', value='tab-eyetracker', children=dcc.Loading(html.Div(id='tab-eyetracker-content'))),
+                dcc.Tab(label='GSR', value='tab-gsr', children=dcc.Loading(html.Div(id='tab-gsr-content'))),
+                dcc.Tab(label='Head movement', value='tab-movement', children=dcc.Loading(html.Div(id='tab-movement-content'))),
+                dcc.Tab(label='Data quality', value='tab-quality', children=dcc.Loading(html.Div(id='tab-quality-content'))),
         ]),
-        # html.Div(id='tabs-content')
     ])
     return layout
 
 
+# Content of one tab
+# fixations: the fixation table of the respondents (datastore/events.py)
+# metrics: their rolling metrics (datastore/metrics.py)
+# scorecard: their data quality scorecard (datastore/quality.py)
+# filter_hash identifies the filters, for the figure cache
+def render_tab(df, fixations, metrics, scorecard, tab, filter_hash=None):
+    if tab == 'tab-eyetracker':
+        return tab_eyes(df, fixations, metrics, filter_hash)
+    elif tab == 'tab-gsr':
+        return tab_gsr(df, metrics, filter_hash)
+    elif tab == 'tab-movement':
+        return tab_movement(df, metrics, filter_hash)
+    elif tab == 'tab-quality':
+        return tab_quality(df, scorecard, filter_hash)
+
+
+# Graphs that are re-queried from the time-series pyramids when zooming
+# (callbacks/zoom_timeseries.py): graph index -> signal(s), title
+ZOOM_LINES = {
+    'gsrraw': ('GSR Raw (microSiemens)', 'GSR over time'),
+    'tonic': ('Tonic signal (microSiemens)', 'Tonic signal over time'),
+    'phasic': ('Phasic signal (microSiemens)', 'Phasic signal over time'),
+    'peaks_detect': ('Peak detected (binary)', 'Peaks detected over time'),
+    'peaks_amp': ('Peak amplitude (microSiemens)', 'Peaks detected over time'),
+}
+ZOOM_SUBPLOTS = {
+    'gyr': (['ET_GyroX', 'ET_GyroY', 'ET_GyroZ'], 'Gyroscope X/Y/Z'),
+    'acc': (['ET_AccX', 'ET_AccY', 'ET_AccZ'], 'Acceleration X/Y/Z'),
+}
+
+# Respondents of a filtered df, and its rows as a mask over the full df (None if it has
+# all rows of the respondents), to query the pyramids with
+def pyramid_rows(pyramids, df):
+    names = list(df['Resp name'].unique())
+    if sum(len(pyramids.rows[name]) for name in names if name in pyramids.rows) == len(df):
+        return names, None
+    keep = np.zeros(pyramids.n, dtype=bool)
+    keep[df.index.to_numpy()] = True
+    return names, keep
+
+
+# Figure of a zoom graph for the visible x ranges ({'xaxis': [x0, x1] or None, ...}),
+# with the rows in keep (mask over the full df, None = all rows of the respondents)
+# The first figure of a tab is the same query without ranges, so every view has at most
+# ZOOM_POINT_BUDGET points per respondent and trace
+def zoom_figure(pyramids, index, names, ranges, keep=None):
+    if index in ZOOM_LINES:
+        signal, title = ZOOM_LINES[index]
+        x_range = ranges.get('xaxis')
+        points = pyramids.frame(names, signal, x_range, keep=keep)
+        fig = px.line(points,
+                      y=signal,
+                      x='Timestamp (s)',
+                      color='Resp name' if len(points) else None,
+                      title=title)
+        if x_range is not None:
+            fig.update_xaxes(range=x_range)
+        return fig
+
+    signals, title = ZOOM_SUBPLOTS[index]
+    fig = make_subplots(rows=1, cols=3)
+    for i, (signal, name) in enumerate(zip(signals, ['Gaze X', 'Gaze Y', 'Gaze Z'])):
+        axis = 'xaxis' if i == 0 else f'xaxis{i + 1}'
+        x_range = ranges.get(axis)
+        points = pyramids.frame(names, signal, x_range, keep=keep).sort_values('Timestamp (s)')
+        fig.add_trace(
+            scatter_trace(len(points))(x=points['Timestamp (s)'], y=points[signal], mode='markers', name=name, marker=dict(size=0.2)),
+            row=1, col=i + 1
+        )
+        if x_range is not None:
+            fig.update_xaxes(range=x_range, row=1, col=i + 1)
+    fig.update_layout(width=1100, height=450, title_text=title)
+    return fig
+
+
 # Tab 1: Eyes
-def tab_eyes(df):
+def tab_eyes(df, fixations, metrics, filter_hash=None):
     # Gaze 2D/3D
-    fig_3dgaze = px.scatter_3d(df,
+    fig_3dgaze = cached_figure('fullroute/3dgaze', filter_hash, lambda: px.scatter_3d(df,
                             x='ET_Gaze3DX',
                              y='ET_Gaze3DY',
                              z='ET_Gaze3DZ',
                              title='Gaze 3D',
                              color='Resp name',
                              size_max=10,
-                             opacity=0.2)
+                             opacity=0.2))
 
-    fig_2dgazeinter = px.scatter(df,
+    fig_2dgazeinter = cached_figure('fullroute/2dgazeinter', filter_hash, lambda: px.scatter(df,
+                            render_mode=render_mode(len(df)),
                             x='Gaze X',
                             y='Gaze Y',
                             opacity=0.2,
                             color='Resp name',
-                            title='Gaze (average of left and right eye)')
+                            title='Gaze (average of left and right eye)'))
 
     # Pupil diameter
-    fig_pupilscat = px.scatter(df,
+    fig_pupilscat = cached_figure('fullroute/pupilscat', filter_hash, lambda: px.scatter(df,
+                        render_mode=render_mode(len(df)),
                         x='ET_PupilLeft',
                         y='ET_PupilRight',
                         title='Pupil size',
@@ -68,24 +207,31 @@ def tab_eyes(df):
                         opacity=.1,
                         labels={
                             "ET_PupilLeft": "Pupil left (mm)",
-                            "ET_PupilRight": "Pupil right (mm)"})
+                            "ET_PupilRight": "Pupil right (mm)"}))
     
-    # Blink
-    fig_blink = px.histogram(df,
-                        x='Blink detected (binary)',
-                        title='Detected blinks',
-                        barmode='group',
+    # Blink rate & pupil size (rolling windows)
+    fig_blink = cached_figure('fullroute/blinkrate', filter_hash, lambda: px.line(metrics,
+                        x='Timestamp (s)',
+                        y='Blink rate (/min)',
+                        color='Resp name',
+                        title='Blink rate'))
+
+    fig_pupiltrend = cached_figure('fullroute/pupiltrend', filter_hash, lambda: px.line(metrics,
+                        x='Timestamp (s)',
+                        y='Pupil size (mm)',
                         color='Resp name',
-                        nbins=2)
+                        title='Pupil size (mean of left and right eye)'))
     
-    # Fixation
-    fig_fixationxy = px.scatter(df[df['Fixation X'].notna()],
+    # Fixation (one point per fixation)
+    fixations = fixations.dropna(subset=['Fixation X', 'Fixation Y'])
+    fig_fixationxy = cached_figure('fullroute/fixationxy', filter_hash, lambda: px.scatter(fixations,
+                            render_mode=render_mode(len(fixations)),
                             x='Fixation X',
                             y='Fixation Y',
                             color='Fixation Dispersion',
                             size='Fixation Duration',
                             opacity=.3,
-                            title='Fixation coordinates, dispersion and duration')
+                            title='Fixation coordinates, dispersion and duration'))
     
     # Saccade
     # ...
@@ -139,7 +285,9 @@ def tab_eyes(df):
                     html.Br(),
                     html.Span('''Pupil diameter: diameter of the left (x-axis) and right (y-axis) pupil.'''),
                     html.Br(),
-                    html.Span('''Blink detection: binary representation of blinks (y-axis) over time (x-axis), where 1 = blink, 0 = no blink.'''),
+                    html.Span(f'''Blink rate: blinks per minute (y-axis) over time (x-axis), in windows of {METRICS_WINDOW} seconds.'''),
+                    html.Br(),
+                    html.Span('''Pupil size: mean diameter of the left and right pupil (y-axis) over time (x-axis), in the same windows.'''),
                 ]),
                 dbc.Row(
                     children=
@@ -155,7 +303,19 @@ def tab_eyes(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_blink)
+                                time_graph('blinkrate', 'Timestamp (s)', fig_blink)
+                            ]
+                        ),
+                    ]
+                ),
+                dbc.Row(
+                    children=
+                    [
+                        dbc.Col(
+                            width=12,
+                            children=
+                            [
+                                time_graph('pupiltrend', 'Timestamp (s)', fig_pupiltrend)
                             ]
                         ),
                     ]
@@ -192,44 +352,30 @@ def tab_eyes(df):
 
 
 # Tab 2: GSR
-def tab_gsr(df):
+# The lines are queried from the time-series pyramids (min/max per bucket, so GSR peaks are always kept)
+def tab_gsr(df, metrics, filter_hash=None):
+    names, keep = pyramid_rows(pyramids, df)
+
     # GSR Raw
-    fig_gsrraw = px.line(df.sort_values('Timestamp'),
-                         y='GSR Raw (microSiemens)',
-                         x='Timestamp (s)',
-                         color='Resp name',
-                         title='GSR over time'
-                         )
+    fig_gsrraw = cached_figure('fullroute/gsrraw', filter_hash, lambda: zoom_figure(pyramids, 'gsrraw', names, {}, keep))
 
     # Tonic signal
-    fig_tonic = px.line(df.sort_values('Timestamp'),
-                         y='Tonic signal (microSiemens)',
-                         x='Timestamp (s)',
-                         color='Resp name',
-                         title='Tonic signal over time'
-                         )
+    fig_tonic = cached_figure('fullroute/tonic', filter_hash, lambda: zoom_figure(pyramids, 'tonic', names, {}, keep))
     # Phasic signal
-    fig_phasic = px.line(df.sort_values('Timestamp'),
-                         y='Phasic signal (microSiemens)',
-                         x='Timestamp (s)',
-                         color='Resp name',
-                         title='Phasic signal over time'
-                         )
-    
+    fig_phasic = cached_figure('fullroute/phasic', filter_hash, lambda: zoom_figure(pyramids, 'phasic', names, {}, keep))
+
     # Peaks
-    fig_peaks_detect = px.line(df.sort_values('Timestamp'),
-                        y='Peak detected (binary)',
-                         x='Timestamp (s)',
-                        color='Resp name',
-                        title='Peaks detected over time'
-                        )
+    fig_peaks_detect = cached_figure('fullroute/peaks_detect', filter_hash,
+                                     lambda: zoom_figure(pyramids, 'peaks_detect', names, {}, keep))
+
+    fig_peaks_amp = cached_figure('fullroute/peaks_amp', filter_hash, lambda: zoom_figure(pyramids, 'peaks_amp', names, {}, keep))
 
-    fig_peaks_amp = px.line(df.sort_values('Timestamp'),
-                        y='Peak amplitude (microSiemens)',
-                         x='Timestamp (s)',
+    # GSR peaks per minute (rolling windows)
+    fig_peakrate = cached_figure('fullroute/peakrate', filter_hash, lambda: px.line(metrics,
+                        x='Timestamp (s)',
+                        y='GSR peaks (/min)',
                         color='Resp name',
-                        title='Peaks detected over time'
-                        )
+                        title='GSR peaks per minute'))
 
     tab_layout = [
         html.Section(
@@ -241,7 +387,7 @@ def tab_gsr(df):
                 [
                     html.Span('Processed and imported data GSR peaks.'),
                     html.Br(),
-                    html.Span('''Raw measurements of GSR signal'''),
+                    html.Span('''Raw measurements of GSR signal, and the number of GSR peaks per minute'''),
                 ]),
                 dbc.Row(
                     children=
@@ -250,7 +396,14 @@ def tab_gsr(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_gsrraw)
+                                time_graph('gsrraw', 'Timestamp (s)', fig_gsrraw, zoom='pyramid')
+                            ]
+                        ),
+                        dbc.Col(
+                            width=6,
+                            children=
+                            [
+                                time_graph('peakrate', 'Timestamp (s)', fig_peakrate)
                             ]
                         ),
                     ]
@@ -273,14 +426,14 @@ def tab_gsr(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_tonic)
+                                time_graph('tonic', 'Timestamp (s)', fig_tonic, zoom='pyramid')
                             ]
                         ),
                         dbc.Col(
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_phasic)
+                                time_graph('phasic', 'Timestamp (s)', fig_phasic, zoom='pyramid')
                             ]
                         ),
                     ]
@@ -305,14 +458,14 @@ def tab_gsr(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_peaks_detect)
+                                time_graph('peaks_detect', 'Timestamp (s)', fig_peaks_detect, zoom='pyramid')
                             ]
                         ),
                         dbc.Col(
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_peaks_amp)
+                                time_graph('peaks_amp', 'Timestamp (s)', fig_peaks_amp, zoom='pyramid')
                             ]
                         ),
                     ]
@@ -325,7 +478,7 @@ def tab_gsr(df):
     return tab_layout
 
 # Tab 3: Movement
-def tab_movement(df):
+def tab_movement(df, metrics, filter_hash=None):
     # fig_gyrx = px.scatter(df,
     #             y='ET_GyroX',
     #             x='Timestamp (s)',
@@ -345,43 +498,10 @@ def tab_movement(df):
     #             color='Resp name',
     #             opacity=0.3).update_traces(marker_size=2)
 
-    fig_gyr = make_subplots(rows=1, cols=3)
-
-    fig_gyr.add_trace(
-        go.Scatter(x=df['Timestamp (s)'], y=df['ET_GyroX'], mode='markers', name='Gaze X', marker=dict(size=0.2)),
-        row=1, col=1
-    )
-
-    fig_gyr.add_trace(
-        go.Scatter(x=df['Timestamp (s)'], y=df['ET_GyroY'], mode='markers', name='Gaze Y', marker=dict(size=0.2)),
-        row=1, col=2
-    )
-
-    fig_gyr.add_trace(
-        go.Scatter(x=df['Timestamp (s)'], y=df['ET_GyroZ'], mode='markers', name='Gaze Z', marker=dict(size=0.2)),
-        row=1, col=3
-    )
-
-    fig_gyr.update_layout(width=1100, height=450, title_text="Gyroscope X/Y/Z")
-
-    fig_acc = make_subplots(rows=1, cols=3)
-
-    fig_acc.add_trace(
-        go.Scatter(x=df['Timestamp (s)'], y=df['ET_AccX'], mode='markers', name='Gaze X', marker=dict(size=0.2)),
-        row=1, col=1
-    )
-
-    fig_acc.add_trace(
-        go.Scatter(x=df['Timestamp (s)'], y=df['ET_AccY'], mode='markers', name='Gaze Y', marker=dict(size=0.2)),
-        row=1, col=2
-    )
-
-    fig_acc.add_trace(
-        go.Scatter(x=df['Timestamp (s)'], y=df['ET_AccZ'], mode='markers', name='Gaze Z', marker=dict(size=0.2)),
-        row=1, col=3
-    )
-
-    fig_acc.update_layout(width=1100, height=450, title_text="Acceleration X/Y/Z")
+    # Gyroscope & accelerometer: queried from the time-series pyramids, like when zooming
+    names, keep = pyramid_rows(pyramids, df)
+    fig_gyr = cached_figure('fullroute/gyr', filter_hash, lambda: zoom_figure(pyramids, 'gyr', names, {}, keep))
+    fig_acc = cached_figure('fullroute/acc', filter_hash, lambda: zoom_figure(pyramids, 'acc', names, {}, keep))
 
 
     # fig_accx = px.scatter(df,
@@ -405,6 +525,13 @@ def tab_movement(df):
     #             opacity=0.3).update_traces(marker_size=2)
 
 
+    # Head angular velocity (rolling windows)
+    fig_headvel = cached_figure('fullroute/headvel', filter_hash, lambda: px.line(metrics,
+                        x='Timestamp (s)',
+                        y='Head velocity (deg/s)',
+                        color='Resp name',
+                        title='Head angular velocity'))
+
     tab_layout = [
         html.Section(
             className='mt-5',
@@ -418,6 +545,8 @@ def tab_movement(df):
                     html.Span('''Gyroscope: Rotation of the glasses along the X, Y an Z axis over time.'''),
                     html.Br(),
                     html.Span('''Accelerometer: Motion along the X, Y and Z axis over time.'''),
+                    html.Br(),
+                    html.Span('''Head velocity: mean angular velocity of the head (gyroscope) over time.'''),
                 ]),
                 dbc.Row(
                     children=
@@ -426,7 +555,7 @@ def tab_movement(df):
                             width=12,
                             children=
                             [
-                                dcc.Graph(figure=fig_gyr)
+                                time_graph('gyr', 'Timestamp (s)', fig_gyr, zoom='pyramid')
                             ]
                         ),
                     ]
@@ -438,7 +567,19 @@ def tab_movement(df):
                             width=4,
                             children=
                             [
-                                dcc.Graph(figure=fig_acc)
+                                time_graph('acc', 'Timestamp (s)', fig_acc, zoom='pyramid')
+                            ]
+                        ),
+                    ]
+                ),
+                dbc.Row(
+                    children=
+                    [
+                        dbc.Col(
+                            width=12,
+                            children=
+                            [
+                                time_graph('headvel', 'Timestamp (s)', fig_headvel)
                             ]
                         ),
                     ]
@@ -450,59 +591,90 @@ def tab_movement(df):
     return tab_layout
 
 # Tab 4: Data quality
-def tab_quality(df):
-    # info for the figures
-    dist_max = df['ET_DistanceLeft'].max()
-
-    # Distance scatter
-    fig_dist = px.scatter(df,
-                        y='ET_DistanceLeft',
-                        x='Relative timestamp (s)',
-                        opacity=0.3,
-                        color='Resp name',
-                        labels={
-                            'ET_DistanceLeft': 'Distance',
-                            'Relative timestamp (s)': 'Time (s)'
-                        },
-                        title='Distance').update_traces(marker_size=4)
-    fig_dist.add_hline(y=900, line_width=1, line_color='red')
-    fig_dist.add_hrect(y0=900, y1=dist_max+17500, fillcolor='red', opacity=0.15, line_width=0, 
-                       annotation_text='90 centimeter threshold', annotation_position='bottom left')
-    fig_dist.update_annotations(font_color='white')
+def tab_quality(df, scorecard, filter_hash=None):
+    def build_dist():
+        # info for the figures
+        dist_max = df['ET_DistanceLeft'].max()
+
+        # Distance scatter
+        fig_dist = px.scatter(df,
+                            render_mode=render_mode(len(df)),
+                            y='ET_DistanceLeft',
+                            x='Relative timestamp (s)',
+                            opacity=0.3,
+                            color='Resp name',
+                            labels={
+                                'ET_DistanceLeft': 'Distance',
+                                'Relative timestamp (s)': 'Time (s)'
+                            },
+                            title='Distance').update_traces(marker_size=4)
+        fig_dist.add_hline(y=QUALITY_MAX_DISTANCE, line_width=1, line_color='red')
+        fig_dist.add_hrect(y0=QUALITY_MAX_DISTANCE, y1=dist_max+17500, fillcolor='red', opacity=0.15, line_width=0, 
+                           annotation_text=f'{QUALITY_MAX_DISTANCE / 10:g} centimeter threshold', annotation_position='bottom left')
+        fig_dist.update_annotations(font_color='white')
+        return fig_dist
+
+    fig_dist = cached_figure('fullroute/dist', filter_hash, build_dist)
 
     # Pupil diamater scatter
-    fig_pupilscat = px.scatter(df,
-                                x='Relative timestamp (s)',
-                                y='ET_PupilLeft',
-                                title='Pupil size',
-                                color='Resp name',
-                                opacity=0.2,
-                                labels={
-                                    'ET_PupilLeft': 'Pupil left (mm)',
-                                    'Relative timestamp (s)': 'Time (s)'
-                                },
-                                ).update_traces(marker_size=4)
-    fig_pupilscat.add_hrect(y0=4.7, y1=5.3, fillcolor='red', opacity=0.15, line_width=0, 
-                            annotation_text='Outliers', annotation_position='bottom left')
-    fig_pupilscat.update_annotations(font_color='white')
+    def build_pupilscat():
+        fig_pupilscat = px.scatter(df,
+                                    render_mode=render_mode(len(df)),
+                                    x='Relative timestamp (s)',
+                                    y='ET_PupilLeft',
+                                    title='Pupil size',
+                                    color='Resp name',
+                                    opacity=0.2,
+                                    labels={
+                                        'ET_PupilLeft': 'Pupil left (mm)',
+                                        'Relative timestamp (s)': 'Time (s)'
+                                    },
+                                    ).update_traces(marker_size=4)
+        fig_pupilscat.add_hrect(y0=QUALITY_PUPIL_OUTLIERS[0], y1=QUALITY_PUPIL_OUTLIERS[1], fillcolor='red', opacity=0.15, line_width=0, 
+                                annotation_text='Outliers', annotation_position='bottom left')
+        fig_pupilscat.update_annotations(font_color='white')
+        return fig_pupilscat
+
+    fig_pupilscat = cached_figure('fullroute/quality_pupilscat', filter_hash, build_pupilscat)
 
     # Validity scatter
-    fig_val = px.scatter(df,
-                        x='Relative timestamp (s)',
-                        y='ET_ValidityLeftEye',
-                        color='Resp name',
-                        opacity=0.2,
-                        title='Eye Validity (left)',
-                        labels={
-                            'ET_ValidityLeftEye': 'Validity',
-                            'Relative timestamp (s)': 'Time (s)'
-                        }
-                        ).update_traces(marker_size=4)
-    fig_val.add_hline(y=4, line_width=1, line_color='red', line_dash='dot',
-                      annotation_text="iMotions: '4 = certainly invalid'", annotation_position='bottom left')
-    fig_val.update_annotations(font_color='red', yshift=-2, xshift=2)
+    def build_val():
+        fig_val = px.scatter(df,
+                            render_mode=render_mode(len(df)),
+                            x='Relative timestamp (s)',
+                            y='ET_ValidityLeftEye',
+                            color='Resp name',
+                            opacity=0.2,
+                            title='Eye Validity (left)',
+                            labels={
+                                'ET_ValidityLeftEye': 'Validity',
+                                'Relative timestamp (s)': 'Time (s)'
+                            }
+                            ).update_traces(marker_size=4)
+        fig_val.add_hline(y=QUALITY_INVALID_VALIDITY, line_width=1, line_color='red', line_dash='dot',
+                          annotation_text="iMotions: '4 = certainly invalid'", annotation_position='bottom left')
+        fig_val.update_annotations(font_color='red', yshift=-2, xshift=2)
+        return fig_val
+
+    fig_val = cached_figure('fullroute/val', filter_hash, build_val)
 
     tab_layout = [
+        html.Section(
+            className='mt-5',
+            children=
+            [
+                html.H4('Scorecard'),
+                html.P(children=
+                    [
+                        html.Span('Share of samples per respondent that fail the data quality checks (distance, pupil outliers, validity), and the intervals of invalid samples.'),
+                        html.Br(),
+                        html.Span("Use 'Exclude invalid samples' in the respondent filters to leave them out of all graphs."),
+                    ]
+                ),
+                scorecard_table(scorecard),
+            ]
+        ),
+
         html.Section(
             className='mt-5',
             children=
@@ -524,7 +696,7 @@ def tab_quality(df):
                             width=12,
                             children=
                             [
-                                dcc.Graph(figure=fig_dist)
+                                time_graph('dist', 'Relative timestamp (s)', fig_dist)
                             ]
                         ),
                     ]
@@ -551,14 +723,14 @@ def tab_quality(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_pupilscat)
+                                time_graph('quality_pupilscat', 'Relative timestamp (s)', fig_pupilscat)
                             ]
                         ),
                         dbc.Col(
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_val)
+                                time_graph('val', 'Relative timestamp (s)', fig_val)
                             ]
                         ),
                     ]
@@ -5,8 +5,10 @@ from dash.dependencies import Input, Output, State
 
 from datetime import date
 
+from datastore.viewpoints import VIEWPOINTS
+
 # HTML elements that occur in all pages (sidebar, header)
-def layout_global(df):
+def layout_global(respondents):
     sidebar = html.Aside(
         [
             html.H2("Sensing Streetscapes", className="sidebartitle"),
@@ -26,15 +28,8 @@ def layout_global(df):
                         direction='right',
                         children=[
                             dbc.DropdownMenuItem(
-                                dbc.NavLink("Viewpoint 1", href="viewpoint-1", active="exact")), 
-                            dbc.DropdownMenuItem(
-                                dbc.NavLink("Viewpoint 2", href="viewpoint-2", active="exact")),
-                            dbc.DropdownMenuItem(
-                                dbc.NavLink("Viewpoint 3", href="viewpoint-3", active="exact")),
-                            dbc.DropdownMenuItem(
-                                dbc.NavLink("Viewpoint 4", href="viewpoint-4", active="exact")), 
-                            dbc.DropdownMenuItem(
-                                dbc.NavLink("Viewpoint 5", href="viewpoint-5", active="exact")),
+                                dbc.NavLink(f"Viewpoint {vp}", href=f"viewpoint-{vp}", active="exact"))
+                            for vp in VIEWPOINTS
                             ],
                         ),
                     dbc.NavLink("Sources", href="/sources", active="exact")
@@ -47,7 +42,7 @@ def layout_global(df):
     )
 
     # Variables for filters:
-    all_resp_names = df['Resp name'].unique()
+    all_resp_names = list(respondents.index)
 
 
     header = html.Header(
@@ -172,7 +167,25 @@ def layout_global(df):
                                                         )
                                                     )
                                                 ]  # End Row (filter controls)
-                                            )
+                                            ),
+                                            dbc.Row(
+                                                dbc.Col(
+                                                    html.Label(
+                                                        [
+                                                            html.P("Data quality"),
+                                                            dcc.Checklist(
+                                                                id='filter-quality-checklist',
+                                                                value=[],
+                                                                className='m-2',
+                                                                options=[
+                                                                    {'label': 'Exclude invalid samples', 'value': 'exclude-invalid'}
+                                                                ]
+                                                            )
+                                                        ],
+                                                        className='filter-checklist'
+                                                    )
+                                                )
+                                            )  # End Row (data quality)
                                         ]
                                     ),  # End Card
                                 ]
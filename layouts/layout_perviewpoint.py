@@ -9,6 +9,16 @@ import plotly.express as px
 from plotly.shapeannotation import annotation_params_for_line, annotation_params_for_rect
 
 from app import app
+from datastore.figure_cache import cached_figure
+from datastore.downsample import downsample
+from datastore.viewpoints import VIEWPOINTS
+from datastore.gaze_density import density_grid
+from datastore.aoi import AOIS, AOIS_VERSION, AOI_STATS, polygon_path
+from layouts.render_policy import render_mode, scatter_trace
+from layouts.scorecard_table import scorecard_table
+from layouts.time_brush import time_graph, time_window_bar
+from config import (METRICS_WINDOW, GAZE_PLOT, DENSITY_CELL_PX, DENSITY_SIGMA, DENSITY_DURATION_WEIGHT,
+                    QUALITY_MAX_DISTANCE, QUALITY_PUPIL_OUTLIERS, QUALITY_INVALID_VALIDITY)
 
 # Layout of the page: DATA PER VIEWPOINT (1)
 # The functions in this file generate the HTML elements with updated plots
@@ -20,98 +30,205 @@ from app import app
 # - Tab 4: Data quality
 # - layout_home combines all the tabs into 1 page layout
 
+# Background image (panorama) of a viewpoint: static URL (see datastore/viewpoints.py), width, height
+def viewpoint_image(vp):
+    viewpoint = VIEWPOINTS[vp]
+    url = app.get_asset_url(viewpoint.image)
+    if viewpoint.version is not None:
+        url += f'?v={viewpoint.version}'
+    return url, viewpoint.width, viewpoint.height
+
+# Panorama as background of a plot (stretched over the plot area)
+def panorama_image(image_url):
+    return dict(source=image_url,
+                xref="paper", yref="paper",
+                sizing='stretch',
+                opacity=1,
+                x=0, y=1,
+                sizex=1, sizey=1,
+                xanchor="left",
+                yanchor="top",
+                layer="below")
+
+# Transparent where nobody looked, so the panorama stays visible
+DENSITY_COLORSCALE = [[0, 'rgba(0,0,255,0)'], [0.05, 'rgba(0,0,255,0.3)'], [0.4, 'rgba(0,255,0,0.5)'],
+                      [0.7, 'rgba(255,255,0,0.6)'], [1, 'rgba(255,0,0,0.75)']]
+
+# Density heatmap of the points (x, y) over the panorama (see datastore/gaze_density.py)
+# The grid covers the panorama (0..width, 0..height, in cells of DENSITY_CELL_PX), not the
+# extent of the data, so a cell is the same size for any selection of respondents
+# A heatmap has no selectable points: an invisible Scattergl trace (two points, at the corners
+# of the panorama) makes sure plotly.js allows box/lasso selections on it. selectedData then only
+# carries the range/lasso (callbacks/cross_filter.py), not thousands of points.
+def density_figure(x, y, title, image_url, width, height, weights=None):
+    extent = (0, width, 0, height)
+    shape = (max(int(height // DENSITY_CELL_PX), 1), max(int(width // DENSITY_CELL_PX), 1))
+    grid, xs, ys = density_grid(x, y, extent, shape, weights, DENSITY_SIGMA)
+
+    fig = go.Figure(go.Heatmap(z=grid.round(3), x=xs, y=ys,
+                               zmin=0, zmax=1,
+                               colorscale=DENSITY_COLORSCALE,
+                               colorbar=dict(title='Density'),
+                               hovertemplate='X: %{x:.0f}<br>Y: %{y:.0f}<br>Density: %{z}<extra></extra>'))
+    fig.add_trace(go.Scattergl(x=[extent[0], extent[1]], y=[extent[2], extent[3]], mode='markers',
+                               marker=dict(opacity=0), selected=dict(marker=dict(opacity=0)),
+                               unselected=dict(marker=dict(opacity=0)), hoverinfo='skip', showlegend=False))
+    fig.update_layout(title=title, width=width, height=height, images=[panorama_image(image_url)], dragmode='select')
+    fig.update_xaxes(range=[extent[0], extent[1]], showgrid=False, zeroline=False)
+    fig.update_yaxes(range=[extent[2], extent[3]], showgrid=False, zeroline=False)
+    return fig
+
+# Areas of interest (polygons) as shapes with their names, on a gaze plot
+# The shapes can be dragged/reshaped: callbacks/edit_aois.py recomputes the AOI table
+def add_aoi_shapes(fig, polygons):
+    for name, polygon in polygons.items():
+        fig.add_shape(type='path', path=polygon_path(polygon), xref='x', yref='y',
+                      line=dict(color='white', width=2), fillcolor='rgba(255,255,255,0.15)')
+        fig.add_annotation(x=polygon[:, 0].mean(), y=polygon[:, 1].mean(), text=name,
+                           showarrow=False, font=dict(color='white'))
+    return fig
+
+# Stats per respondent & AOI (datastore/aoi.py) as a table
+def aoi_table(stats):
+    if len(stats) == 0:
+        return html.P('No gaze samples in the areas of interest.')
+    table_header = [html.Thead(html.Tr([html.Th(key) for key in ['Respondent', 'AOI'] + AOI_STATS]))]
+    table_rows = [
+        html.Tr([html.Td(row['Resp name']), html.Td(row['AOI'])] +
+                [html.Td('-' if pd.isna(row[stat]) else f'{row[stat]:.1f}' if stat.endswith('(s)') else int(row[stat]))
+                 for stat in AOI_STATS])
+        for _, row in stats.iterrows()
+    ]
+    return dbc.Table(table_header + [html.Tbody(table_rows)], bordered=True, size='sm')
+
 # Combined layout:
-def layout_perviewpoint(df, pathname, bgimg, width, height):
-    # Filter DF based on pathname (welke viewpoint is het)
+# The tabs are empty here, the content of the chosen tab is rendered by the
+# 'tabs-nav' callback (callbacks/render_tabs.py) with render_tab()
+def layout_perviewpoint():
     layout = [
+        dcc.Store(id='tabs-rendered', data=[]),     # tabs that already have their content
+        time_window_bar(),                          # brushed time window
+        dcc.Store(id='gaze-selection', data=None),  # box/lasso selection on the gaze/fixation plot
         dcc.Tabs(
+            id='tabs-nav',
+            value='tab-eyetracker',
             className='mb-5',
             children=
             [
-                dcc.Tab(label='Eyetracker', children=tab_eyes(df, bgimg, width, height)),
-                dcc.Tab(label='GSR', children=tab_gsr(df)),
-                dcc.Tab(label='Head movement', children=tab_movement(df)),
-                dcc.Tab(label='Data quality', children=tab_quality(df)),
+                dcc.Tab(label='Eyetracker', value='tab-eyetracker', children=dcc.Loading(html.Div(id='tab-eyetracker-content'))),
+                dcc.Tab(label='GSR', value='tab-gsr', children=dcc.Loading(html.Div(id='tab-gsr-content'))),
+                dcc.Tab(label='Head movement', value='tab-movement', children=dcc.Loading(html.Div(id='tab-movement-content'))),
+                dcc.Tab(label='Data quality', value='tab-quality', children=dcc.Loading(html.Div(id='tab-quality-content'))),
         ])
     ]
     return layout
 
+# Content of one tab (df and fixations are already filtered on viewpoint vp)
+# fixations: the fixation table of the respondents (datastore/events.py)
+# metrics: their rolling metrics (datastore/metrics.py)
+# scorecard: their data quality scorecard (datastore/quality.py)
+# aoi_stats: their stats per area of interest of the viewpoint (datastore/aoi.py)
+# filter_hash identifies the filters + viewpoint, for the figure cache
+def render_tab(df, fixations, metrics, scorecard, aoi_stats, tab, vp, filter_hash=None):
+    if tab == 'tab-eyetracker':
+        image_url, width, height = viewpoint_image(vp)
+        return tab_eyes(df, fixations, metrics, AOIS.get(vp, {}), aoi_stats, image_url, width, height, filter_hash)
+    elif tab == 'tab-gsr':
+        return tab_gsr(df, metrics, filter_hash)
+    elif tab == 'tab-movement':
+        return tab_movement(df, metrics, filter_hash)
+    elif tab == 'tab-quality':
+        return tab_quality(df, scorecard, filter_hash)
+
+# Pupil diameter scatter (Eyes tab, also redrawn for a box/lasso selection: callbacks/cross_filter.py)
+# (a selection can be empty: px can't color an empty df by respondent)
+def pupil_figure(df):
+    return px.scatter(df,
+                      render_mode=render_mode(len(df)),
+                      x='ET_PupilLeft',
+                      y='ET_PupilRight',
+                      title='Pupil size',
+                      color='Resp name' if len(df) else None,
+                      opacity=.1,
+                      labels={
+                          "ET_PupilLeft": "Pupil left (mm)",
+                          "ET_PupilRight": "Pupil right (mm)"})
+
 # Tab 1: Eyes
-def tab_eyes(df, bgimg, width, height):
+# aois: {AOI: polygon} of the viewpoint, aoi_stats: their stats (per respondent)
+def tab_eyes(df, fixations, metrics, aois, aoi_stats, image_url, width, height, filter_hash=None):
     # 3D Gaze
-    fig_3dgaze = px.scatter_3d(df,
+    fig_3dgaze = cached_figure('perviewpoint/3dgaze', filter_hash, lambda: px.scatter_3d(df,
                              x='ET_Gaze3DX',
                              y='ET_Gaze3DY',
                              z='ET_Gaze3DZ',
                              title='Gaze X, Y and Z',
                              color='Resp name',
                              size_max=10,
-                             opacity=0.4)
+                             opacity=0.4))
 
     # 2D Gaze
-    fig_2dgazeinter = px.scatter(df,
-                            x='Gaze X',
-                            y='Gaze Y',
-                            title='Gaze (average of left and right eye)',
-                            color='Resp name',
-                            opacity=0.4,
-                            width=width,
-                            height=height
-                            )
-
-    fig_2dgazeinter.update_layout(
-                images= [dict(
-                    source='data:image/png;base64,{}'.format(bgimg.decode()),
-                    xref="paper", yref="paper",
-                    sizing='stretch',
-                    opacity=1,
-                    x=0, y=1,
-                    sizex=1, sizey=1,
-                    xanchor="left",
-                    yanchor="top",
-                    #sizing="stretch",
-                    layer="below")])
+    def build_2dgazeinter():
+        if GAZE_PLOT == 'density':
+            fig = density_figure(df['Gaze X'], df['Gaze Y'], 'Gaze density (average of left and right eye)',
+                                 image_url, width, height)
+            return add_aoi_shapes(fig, aois)
+
+        fig_2dgazeinter = px.scatter(df,
+                                render_mode=render_mode(len(df)),
+                                x='Gaze X',
+                                y='Gaze Y',
+                                title='Gaze (average of left and right eye)',
+                                color='Resp name',
+                                opacity=0.4,
+                                width=width,
+                                height=height
+                                )
+
+        fig_2dgazeinter.update_layout(images=[panorama_image(image_url)], dragmode='select')
+        return add_aoi_shapes(fig_2dgazeinter, aois)
+
+    fig_2dgazeinter = cached_figure(f'perviewpoint/2dgazeinter-{AOIS_VERSION}', filter_hash, build_2dgazeinter)
 
     # Pupil diameter
-    fig_pupilscat = px.scatter(df,
-                        x='ET_PupilLeft',
-                        y='ET_PupilRight',
-                        title='Pupil size',
-                        color='Resp name',
-                        opacity=.1,
-                        labels={
-                            "ET_PupilLeft": "Pupil left (mm)",
-                            "ET_PupilRight": "Pupil right (mm)"})
+    fig_pupilscat = cached_figure('perviewpoint/pupilscat', filter_hash, lambda: pupil_figure(df))
     
-    # Blink
-    fig_blink = px.histogram(df,
-                        x='Blink detected (binary)',
+    # Blink rate & pupil size (rolling windows)
+    fig_blink = cached_figure('perviewpoint/blinkrate', filter_hash, lambda: px.line(metrics,
+                        x='Relative timestamp (s)',
+                        y='Blink rate (/min)',
+                        color='Resp name',
+                        title='Blink rate'))
+
+    fig_pupiltrend = cached_figure('perviewpoint/pupiltrend', filter_hash, lambda: px.line(metrics,
+                        x='Relative timestamp (s)',
+                        y='Pupil size (mm)',
                         color='Resp name',
-                        barmode='group',
-                        title='Detected blinks',
-                        nbins=2)
+                        title='Pupil size (mean of left and right eye)'))
     
-    # Fixation
-    fig_fixationxy = px.scatter(df[df['Fixation X'].notna()],
-                            x='Fixation X',
-                            y='Fixation Y',
-                            color='Fixation Dispersion',
-                            size='Fixation Duration',
-                            opacity=.3,
-                            title='Fixation coordinates, dispersion and duration')
-
-    fig_fixationxy.update_layout(
-                images= [dict(
-                    source='data:image/png;base64,{}'.format(bgimg.decode()),
-                    xref="paper", yref="paper",
-                    sizing='stretch',
-                    opacity=1,
-                    x=0, y=1,
-                    sizex=1, sizey=1,
-                    xanchor="left",
-                    yanchor="top",
-                    #sizing="stretch",
-                    layer="below")])
+    # Fixation (one point per fixation)
+    fixations = fixations.dropna(subset=['Fixation X', 'Fixation Y'])
+
+    def build_fixationxy():
+        if GAZE_PLOT == 'density':
+            weights = fixations['Fixation Duration'] if DENSITY_DURATION_WEIGHT else None
+            return density_figure(fixations['Fixation X'], fixations['Fixation Y'],
+                                  'Fixation density' + (' (weighted by duration)' if DENSITY_DURATION_WEIGHT else ''),
+                                  image_url, width, height, weights)
+
+        fig_fixationxy = px.scatter(fixations,
+                                render_mode=render_mode(len(fixations)),
+                                x='Fixation X',
+                                y='Fixation Y',
+                                color='Fixation Dispersion',
+                                size='Fixation Duration',
+                                opacity=.3,
+                                title='Fixation coordinates, dispersion and duration')
+
+        fig_fixationxy.update_layout(images=[panorama_image(image_url)], dragmode='select')
+        return fig_fixationxy
+
+    fig_fixationxy = cached_figure('perviewpoint/fixationxy', filter_hash, build_fixationxy)
 
     # Saccade
     # ...
@@ -132,6 +249,8 @@ def tab_eyes(df, bgimg, width, height):
                     average of left and right eye, uninterpolated).'''),
                     html.Br(),
                     html.Span('''3D points: coordinates (X, Y, Z) of the gaze point, relative to position of eyetracker's scene camera.'''),
+                    html.Br(),
+                    html.Span('''Select an area (box or lasso) on the 2D gaze or the fixation plot to show only those samples in the pupil plot and the other tabs.'''),
                 ]),
                 dbc.Row(
                     children=
@@ -147,7 +266,8 @@ def tab_eyes(df, bgimg, width, height):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_2dgazeinter)
+                                dcc.Graph(id='aoi-gaze-graph', figure=fig_2dgazeinter,
+                                          config={'edits': {'shapePosition': True}})
                             ]
                         ),
                     ]
@@ -165,7 +285,9 @@ def tab_eyes(df, bgimg, width, height):
                     html.Br(),
                     html.Span('''Pupil diameter: diameter of the left (x-axis) and right (y-axis) pupil.'''),
                     html.Br(),
-                    html.Span('''Blink detection: binary representation of blinks (y-axis) over time (x-axis), where 1 = blink, 0 = no blink.'''),
+                    html.Span(f'''Blink rate: blinks per minute (y-axis) over time (x-axis), in windows of {METRICS_WINDOW} seconds.'''),
+                    html.Br(),
+                    html.Span('''Pupil size: mean diameter of the left and right pupil (y-axis) over time (x-axis), in the same windows.'''),
                 ]),
                 dbc.Row(
                     children=
@@ -174,14 +296,26 @@ def tab_eyes(df, bgimg, width, height):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_pupilscat)
+                                dcc.Graph(id='pupil-graph', figure=fig_pupilscat)
                             ]
                         ),
                         dbc.Col(
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_blink)
+                                time_graph('blinkrate', 'Relative timestamp (s)', fig_blink)
+                            ]
+                        ),
+                    ]
+                ),
+                dbc.Row(
+                    children=
+                    [
+                        dbc.Col(
+                            width=12,
+                            children=
+                            [
+                                time_graph('pupiltrend', 'Relative timestamp (s)', fig_pupiltrend)
                             ]
                         ),
                     ]
@@ -197,7 +331,8 @@ def tab_eyes(df, bgimg, width, height):
                 html.H4('Fixations'),
                 html.P(children=
                 [
-                    html.Span('Fixations X and Y coordinates plotted against each other, where size = fixation duration and color = fixation dispersion.'),
+                    html.Span('Density of the fixations on the panorama (red = most attention).' if GAZE_PLOT == 'density' else
+                              'Fixations X and Y coordinates plotted against each other, where size = fixation duration and color = fixation dispersion.'),
                 ]),
                 dbc.Row(
                     children=
@@ -206,7 +341,7 @@ def tab_eyes(df, bgimg, width, height):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_fixationxy)
+                                dcc.Graph(id='fixation-graph', figure=fig_fixationxy)
                             ]
                         ),
                         # Add fixation plots...
@@ -214,48 +349,73 @@ def tab_eyes(df, bgimg, width, height):
                 ),
             ]
         ),
+
+        html.Section(           # Section: Areas of interest
+            className='mt-5',
+            children=
+            [
+                html.H4('Areas of interest'),
+                html.P(children=
+                [
+                    html.Span('Dwell time (gaze samples), fixations and time to first fixation (since entering the viewpoint) per respondent and area of interest.'),
+                    html.Br(),
+                    html.Span('Drag or reshape an area on the gaze plot to recompute the table.'),
+                ]),
+                dcc.Store(id='aoi-polygons', data={'names': list(aois), 'polygons': [p.tolist() for p in aois.values()]}),
+                html.Div(id='aoi-table', children=aoi_table(aoi_stats) if aois else
+                         html.P('No areas of interest for this viewpoint (see AOI_FILE in config.py).')),
+            ]
+        ),
     ]
     return tab_layout
 
 # Tab 2: GSR
-def tab_gsr(df):
+# The lines are downsampled per respondent (GSR peaks are always kept)
+def tab_gsr(df, metrics, filter_hash=None):
     # GSR Raw
-    fig_gsrraw = px.line(df.sort_values('Timestamp'),
+    fig_gsrraw = cached_figure('perviewpoint/gsrraw', filter_hash, lambda: px.line(downsample(df, 'Relative timestamp (s)', 'GSR Raw (microSiemens)'),
                          y='GSR Raw (microSiemens)',
                          x='Relative timestamp (s)',
                          color='Resp name',
                          title='GSR over time'
-                         )
+                         ))
 
     # Tonic signal
-    fig_tonic = px.line(df.sort_values('Timestamp'),
+    fig_tonic = cached_figure('perviewpoint/tonic', filter_hash, lambda: px.line(downsample(df, 'Relative timestamp (s)', 'Tonic signal (microSiemens)'),
                          y='Tonic signal (microSiemens)',
                          x='Relative timestamp (s)',
                          color='Resp name',
                          title='Tonic signal over time'
-                         )
+                         ))
     # Phasic signal
-    fig_phasic = px.line(df.sort_values('Timestamp'),
+    fig_phasic = cached_figure('perviewpoint/phasic', filter_hash, lambda: px.line(downsample(df, 'Relative timestamp (s)', 'Phasic signal (microSiemens)'),
                          y='Phasic signal (microSiemens)',
                          x='Relative timestamp (s)',
                          color='Resp name',
                          title='Phasic signal over time'
-                         )
+                         ))
     
     # Peaks
-    fig_peaks_detect = px.line(df.sort_values('Timestamp'),
+    fig_peaks_detect = cached_figure('perviewpoint/peaks_detect', filter_hash, lambda: px.line(downsample(df, 'Relative timestamp (s)', 'Peak detected (binary)'),
                         y='Peak detected (binary)',
                          x='Relative timestamp (s)',
                         color='Resp name',
                         title='Peaks detected over time'
-                        )
+                        ))
 
-    fig_peaks_amp = px.line(df.sort_values('Timestamp'),
+    fig_peaks_amp = cached_figure('perviewpoint/peaks_amp', filter_hash, lambda: px.line(downsample(df, 'Relative timestamp (s)', 'Peak amplitude (microSiemens)'),
                         y='Peak amplitude (microSiemens)',
                          x='Relative timestamp (s)',
                         color='Resp name',
                         title='Peaks detected over time'
-                        )
+                        ))
+
+    # GSR peaks per minute (rolling windows)
+    fig_peakrate = cached_figure('perviewpoint/peakrate', filter_hash, lambda: px.line(metrics,
+                        x='Relative timestamp (s)',
+                        y='GSR peaks (/min)',
+                        color='Resp name',
+                        title='GSR peaks per minute'))
 
     tab_layout = [
         html.Section(
@@ -267,7 +427,7 @@ def tab_gsr(df):
                 [
                     html.Span('Processed and imported data GSR peaks.'),
                     html.Br(),
-                    html.Span('''Raw measurements of GSR signal'''),
+                    html.Span('''Raw measurements of GSR signal, and the number of GSR peaks per minute'''),
                 ]),
                 dbc.Row(
                     children=
@@ -276,7 +436,14 @@ def tab_gsr(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_gsrraw)
+                                time_graph('gsrraw', 'Relative timestamp (s)', fig_gsrraw)
+                            ]
+                        ),
+                        dbc.Col(
+                            width=6,
+                            children=
+                            [
+                                time_graph('peakrate', 'Relative timestamp (s)', fig_peakrate)
                             ]
                         ),
                     ]
@@ -299,14 +466,14 @@ def tab_gsr(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_tonic)
+                                time_graph('tonic', 'Relative timestamp (s)', fig_tonic)
                             ]
                         ),
                         dbc.Col(
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_phasic)
+                                time_graph('phasic', 'Relative timestamp (s)', fig_phasic)
                             ]
                         ),
                     ]
@@ -331,14 +498,14 @@ def tab_gsr(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_peaks_detect)
+                                time_graph('peaks_detect', 'Relative timestamp (s)', fig_peaks_detect)
                             ]
                         ),
                         dbc.Col(
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_peaks_amp)
+                                time_graph('peaks_amp', 'Relative timestamp (s)', fig_peaks_amp)
                             ]
                         ),
                     ]
@@ -350,7 +517,7 @@ def tab_gsr(df):
     return tab_layout
 
 # Tab 3: Movement
-def tab_movement(df):
+def tab_movement(df, metrics, filter_hash=None):
     # fig_gyrx = px.scatter(df,
     #             y='ET_GyroX',
     #             x='Relative timestamp (s)',
@@ -392,46 +559,63 @@ def tab_movement(df):
     #             opacity=0.3).update_traces(marker_size=2)
 
     
-    fig_gyr = make_subplots(rows=1, cols=3)
+    def build_gyr():
+        Scatter = scatter_trace(len(df))
+        fig_gyr = make_subplots(rows=1, cols=3)
 
-    fig_gyr.add_trace(
-        go.Scatter(x=df['Relative timestamp (s)'], y=df['ET_GyroX'], mode='markers', name='Gaze X', marker=dict(size=0.2)),
-        row=1, col=1
-    )
+        fig_gyr.add_trace(
+            Scatter(x=df['Relative timestamp (s)'], y=df['ET_GyroX'], mode='markers', name='Gaze X', marker=dict(size=0.2)),
+            row=1, col=1
+        )
 
-    fig_gyr.add_trace(
-        go.Scatter(x=df['Relative timestamp (s)'], y=df['ET_GyroY'], mode='markers', name='Gaze Y', marker=dict(size=0.2)),
-        row=1, col=2
-    )
+        fig_gyr.add_trace(
+            Scatter(x=df['Relative timestamp (s)'], y=df['ET_GyroY'], mode='markers', name='Gaze Y', marker=dict(size=0.2)),
+            row=1, col=2
+        )
 
-    fig_gyr.add_trace(
-        go.Scatter(x=df['Relative timestamp (s)'], y=df['ET_GyroZ'], mode='markers', name='Gaze Z', marker=dict(size=0.2)),
-        row=1, col=3
-    )
+        fig_gyr.add_trace(
+            Scatter(x=df['Relative timestamp (s)'], y=df['ET_GyroZ'], mode='markers', name='Gaze Z', marker=dict(size=0.2)),
+            row=1, col=3
+        )
 
-    fig_gyr.update_layout(width=1100, height=450, title_text="Gyroscope X/Y/Z")
+        fig_gyr.update_layout(width=1100, height=450, title_text="Gyroscope X/Y/Z")
+        return fig_gyr
 
+    fig_gyr = cached_figure('perviewpoint/gyr', filter_hash, build_gyr)
 
-    fig_acc = make_subplots(rows=1, cols=3)
 
-    fig_acc.add_trace(
-        go.Scatter(x=df['Relative timestamp (s)'], y=df['ET_AccX'], mode='markers', name='Gaze X', marker=dict(size=0.2)),
-        row=1, col=1
-    )
+    def build_acc():
+        Scatter = scatter_trace(len(df))
+        fig_acc = make_subplots(rows=1, cols=3)
 
-    fig_acc.add_trace(
-        go.Scatter(x=df['Relative timestamp (s)'], y=df['ET_AccY'], mode='markers', name='Gaze Y', marker=dict(size=0.2)),
-        row=1, col=2
-    )
+        fig_acc.add_trace(
+            Scatter(x=df['Relative timestamp (s)'], y=df['ET_AccX'], mode='markers', name='Gaze X', marker=dict(size=0.2)),
+            row=1, col=1
+        )
 
-    fig_acc.add_trace(
-        go.Scatter(x=df['Relative timestamp (s)'], y=df['ET_AccZ'], mode='markers', name='Gaze Z', marker=dict(size=0.2)),
-        row=1, col=3
-    )
+        fig_acc.add_trace(
+            Scatter(x=df['Relative timestamp (s)'], y=df['ET_AccY'], mode='markers', name='Gaze Y', marker=dict(size=0.2)),
+            row=1, col=2
+        )
 
-    fig_acc.update_layout(width=1100, height=450, title_text="Acceleration X/Y/Z")
+        fig_acc.add_trace(
+            Scatter(x=df['Relative timestamp (s)'], y=df['ET_AccZ'], mode='markers', name='Gaze Z', marker=dict(size=0.2)),
+            row=1, col=3
+        )
 
+        fig_acc.update_layout(width=1100, height=450, title_text="Acceleration X/Y/Z")
+        return fig_acc
 
+    fig_acc = cached_figure('perviewpoint/acc', filter_hash, build_acc)
+
+
+
+    # Head angular velocity (rolling windows)
+    fig_headvel = cached_figure('perviewpoint/headvel', filter_hash, lambda: px.line(metrics,
+                        x='Relative timestamp (s)',
+                        y='Head velocity (deg/s)',
+                        color='Resp name',
+                        title='Head angular velocity'))
 
     tab_layout = [
         html.Section(
@@ -446,6 +630,8 @@ def tab_movement(df):
                     html.Span('''Gyroscope: Rotation of the glasses along the X, Y an Z axis over time.'''),
                     html.Br(),
                     html.Span('''Accelerometer: Motion along the X, Y and Z axis over time.'''),
+                    html.Br(),
+                    html.Span('''Head velocity: mean angular velocity of the head (gyroscope) over time.'''),
                 ]),
                 dbc.Row(
                     children=
@@ -454,7 +640,7 @@ def tab_movement(df):
                             width=12,
                             children=
                             [
-                                dcc.Graph(figure=fig_gyr)
+                                time_graph('gyr', 'Relative timestamp (s)', fig_gyr)
                             ]
                         ),
                     ]
@@ -466,7 +652,19 @@ def tab_movement(df):
                             width=12,
                             children=
                             [
-                                dcc.Graph(figure=fig_acc)
+                                time_graph('acc', 'Relative timestamp (s)', fig_acc)
+                            ]
+                        ),
+                    ]
+                ),
+                dbc.Row(
+                    children=
+                    [
+                        dbc.Col(
+                            width=12,
+                            children=
+                            [
+                                time_graph('headvel', 'Relative timestamp (s)', fig_headvel)
                             ]
                         ),
                     ]
@@ -478,59 +676,90 @@ def tab_movement(df):
     return tab_layout
 
 # Tab 4: Data quality
-def tab_quality(df):
-    # info for the figures
-    dist_max = df['ET_DistanceLeft'].max()
-
-    # Distance scatter
-    fig_dist = px.scatter(df,
-                        y='ET_DistanceLeft',
-                        x='Relative timestamp (s)',
-                        opacity=0.3,
-                        color='Resp name',
-                        labels={
-                            'ET_DistanceLeft': 'Distance',
-                            'Relative timestamp (s)': 'Time (s)'
-                        },
-                        title='Distance').update_traces(marker_size=4)
-    fig_dist.add_hline(y=900, line_width=1, line_color='red')
-    fig_dist.add_hrect(y0=900, y1=dist_max+2000, fillcolor='red', opacity=0.15, line_width=0, 
-                       annotation_text='90 centimeter threshold', annotation_position='bottom left')
-    fig_dist.update_annotations(font_color='white')
+def tab_quality(df, scorecard, filter_hash=None):
+    def build_dist():
+        # info for the figures
+        dist_max = df['ET_DistanceLeft'].max()
+
+        # Distance scatter
+        fig_dist = px.scatter(df,
+                            render_mode=render_mode(len(df)),
+                            y='ET_DistanceLeft',
+                            x='Relative timestamp (s)',
+                            opacity=0.3,
+                            color='Resp name',
+                            labels={
+                                'ET_DistanceLeft': 'Distance',
+                                'Relative timestamp (s)': 'Time (s)'
+                            },
+                            title='Distance').update_traces(marker_size=4)
+        fig_dist.add_hline(y=QUALITY_MAX_DISTANCE, line_width=1, line_color='red')
+        fig_dist.add_hrect(y0=QUALITY_MAX_DISTANCE, y1=dist_max+2000, fillcolor='red', opacity=0.15, line_width=0, 
+                           annotation_text=f'{QUALITY_MAX_DISTANCE / 10:g} centimeter threshold', annotation_position='bottom left')
+        fig_dist.update_annotations(font_color='white')
+        return fig_dist
+
+    fig_dist = cached_figure('perviewpoint/dist', filter_hash, build_dist)
 
     # Pupil diamater scatter
-    fig_pupilscat = px.scatter(df,
-                                x='Relative timestamp (s)',
-                                y='ET_PupilLeft',
-                                title='Pupil size',
-                                color='Resp name',
-                                opacity=0.2,
-                                labels={
-                                    'ET_PupilLeft': 'Pupil left (mm)',
-                                    'Relative timestamp (s)': 'Time (s)'
-                                },
-                                ).update_traces(marker_size=4)
-    fig_pupilscat.add_hrect(y0=4.7, y1=5.3, fillcolor='red', opacity=0.15, line_width=0, 
-                            annotation_text='Outliers', annotation_position='bottom left')
-    fig_pupilscat.update_annotations(font_color='white')
+    def build_pupilscat():
+        fig_pupilscat = px.scatter(df,
+                                    render_mode=render_mode(len(df)),
+                                    x='Relative timestamp (s)',
+                                    y='ET_PupilLeft',
+                                    title='Pupil size',
+                                    color='Resp name',
+                                    opacity=0.2,
+                                    labels={
+                                        'ET_PupilLeft': 'Pupil left (mm)',
+                                        'Relative timestamp (s)': 'Time (s)'
+                                    },
+                                    ).update_traces(marker_size=4)
+        fig_pupilscat.add_hrect(y0=QUALITY_PUPIL_OUTLIERS[0], y1=QUALITY_PUPIL_OUTLIERS[1], fillcolor='red', opacity=0.15, line_width=0, 
+                                annotation_text='Outliers', annotation_position='bottom left')
+        fig_pupilscat.update_annotations(font_color='white')
+        return fig_pupilscat
+
+    fig_pupilscat = cached_figure('perviewpoint/quality_pupilscat', filter_hash, build_pupilscat)
 
     # Validity scatter
-    fig_val = px.scatter(df,
-                        x='Relative timestamp (s)',
-                        y='ET_ValidityLeftEye',
-                        color='Resp name',
-                        opacity=0.2,
-                        title='Eye Validity (left)',
-                        labels={
-                            'ET_ValidityLeftEye': 'Validity',
-                            'Relative timestamp (s)': 'Time (s)'
-                        }
-                        ).update_traces(marker_size=4)
-    fig_val.add_hline(y=4, line_width=1, line_color='red', line_dash='dot',
-                      annotation_text="iMotions: '4 = certainly invalid'", annotation_position='bottom left')
-    fig_val.update_annotations(font_color='red', yshift=-2, xshift=2)
+    def build_val():
+        fig_val = px.scatter(df,
+                            render_mode=render_mode(len(df)),
+                            x='Relative timestamp (s)',
+                            y='ET_ValidityLeftEye',
+                            color='Resp name',
+                            opacity=0.2,
+                            title='Eye Validity (left)',
+                            labels={
+                                'ET_ValidityLeftEye': 'Validity',
+                                'Relative timestamp (s)': 'Time (s)'
+                            }
+                            ).update_traces(marker_size=4)
+        fig_val.add_hline(y=QUALITY_INVALID_VALIDITY, line_width=1, line_color='red', line_dash='dot',
+                          annotation_text="iMotions: '4 = certainly invalid'", annotation_position='bottom left')
+        fig_val.update_annotations(font_color='red', yshift=-2, xshift=2)
+        return fig_val
+
+    fig_val = cached_figure('perviewpoint/val', filter_hash, build_val)
 
     tab_layout = [
+        html.Section(
+            className='mt-5',
+            children=
+            [
+                html.H4('Scorecard'),
+                html.P(children=
+                    [
+                        html.Span('Share of samples per respondent that fail the data quality checks (distance, pupil outliers, validity), and the intervals of invalid samples.'),
+                        html.Br(),
+                        html.Span("Use 'Exclude invalid samples' in the respondent filters to leave them out of all graphs."),
+                    ]
+                ),
+                scorecard_table(scorecard),
+            ]
+        ),
+
         html.Section(
             className='mt-5',
             children=
@@ -550,7 +779,7 @@ def tab_quality(df):
                             width=12,
                             children=
                             [
-                                dcc.Graph(figure=fig_dist)
+                                time_graph('dist', 'Relative timestamp (s)', fig_dist)
                             ]
                         ),
                     ]
@@ -577,14 +806,14 @@ def tab_quality(df):
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_pupilscat)
+                                time_graph('quality_pupilscat', 'Relative timestamp (s)', fig_pupilscat)
                             ]
                         ),
                         dbc.Col(
                             width=6,
                             children=
                             [
-                                dcc.Graph(figure=fig_val)
+                                time_graph('val', 'Relative timestamp (s)', fig_val)
                             ]
                         ),
                     ]
@@ -0,0 +1,16 @@
+import plotly.graph_objects as go
+
+from config import WEBGL_POINT_THRESHOLD
+
+# Rendering of scatter plots: SVG for small plots, WebGL above WEBGL_POINT_THRESHOLD points
+# (SVG draws every marker as a DOM element, which makes big plots unusable in the browser)
+
+
+# render_mode for px.scatter
+def render_mode(n_points):
+    return 'webgl' if n_points > WEBGL_POINT_THRESHOLD else 'svg'
+
+
+# trace class for graph_objects scatters
+def scatter_trace(n_points):
+    return go.Scattergl if n_points > WEBGL_POINT_THRESHOLD else go.Scatter
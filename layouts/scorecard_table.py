@@ -0,0 +1,21 @@
+import dash_bootstrap_components as dbc
+import dash_html_components as html
+
+from datastore.quality import SCORECARD_NAMES
+
+# Data quality scorecard (datastore/quality.py) as a compact table: one row per respondent
+# (Data quality tab of the full route & per viewpoint pages)
+
+
+def scorecard_table(scorecard):
+    table_header = [html.Thead(html.Tr([html.Th(key) for key in ['Respondent'] + SCORECARD_NAMES]))]
+
+    # percentages & seconds with 1 decimal, counts as integers
+    table_rows = [
+        html.Tr([html.Td(row['Resp name'])] +
+                [html.Td(f'{row[name]:.1f}' if name.endswith(('(%)', '(s)')) else int(row[name]))
+                 for name in SCORECARD_NAMES])
+        for _, row in scorecard.iterrows()
+    ]
+    table_body = [html.Tbody(table_rows)]
+    return dbc.Table(table_header + table_body, bordered=True, size='sm')
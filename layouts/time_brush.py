@@ -0,0 +1,40 @@
+import dash_bootstrap_components as dbc
+import dash_core_components as dcc
+import dash_html_components as html
+
+# Time-range brushing (full route & per viewpoint pages)
+# A horizontal box selection on a time graph sets the window in the Store 'time-window',
+# the tabs are rendered again with only the samples in that window (callbacks/time_brush.py)
+
+WINDOW_HINT = 'Select a time range (box select) on a graph over time to show only that window in all graphs.'
+
+
+# Horizontal box selection as the drag mode (uirevision: the mode the user picks in the
+# modebar, e.g. zoom, is kept when the figure is updated)
+def brushable(figure):
+    brush = dict(dragmode='select', selectdirection='h', uirevision='time-graph')
+    if isinstance(figure, dict):    # from the figure cache
+        figure.setdefault('layout', {}).update(brush)
+    else:
+        figure.update_layout(**brush)
+    return figure
+
+
+# Graph over time (x axis: column) that can be brushed
+# zoom='pyramid': zooming re-queries the time-series pyramids (callbacks/zoom_timeseries.py)
+def time_graph(name, column, figure, zoom='none'):
+    return dcc.Graph(id={'type': 'time-graph', 'index': name, 'column': column, 'zoom': zoom},
+                     figure=brushable(figure))
+
+
+# Store, current window and clear button (above the tabs)
+def time_window_bar():
+    return html.Div(
+        className='d-flex align-items-center mb-3',
+        children=
+        [
+            dcc.Store(id='time-window', data=None),
+            html.Span(WINDOW_HINT, id='time-window-info', className='mr-2'),
+            dbc.Button('Clear time window', id='time-window-clear', color='link', size='sm'),
+        ]
+    )
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app modules import each other from the repository root (as index.py/wsgi.py are run)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Small synthetic iMotions export (the columns the dashboard reads) for the tests
+
+EVENT_COLS = ['Fixation Index', 'Fixation X', 'Fixation Y', 'Fixation Duration', 'Fixation Dispersion',
+              'Saccade Index', 'Saccade Duration', 'Saccade Amplitude']
+
+
+def export_frame(respondents=3, samples=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for r in range(respondents):
+        t = np.arange(samples) * 20.0   # ms
+        d = pd.DataFrame({'Timestamp': t, 'Timestamp (s)': t / 1000})
+        d['Resp name'] = f'Resp_{r}'
+        d['Resp gender'] = ['MALE', 'FEMALE'][r % 2]
+        d['Resp age'] = 16 + r % 3
+        d['Resp rec datetime'] = f'2021-05-20 {9 + r}:{r * 7 % 60:02d}:00'
+
+        # Gaze: fixations (a few samples around a point) and jumps between them
+        fixation = np.cumsum(rng.random(samples) < .05)
+        d['Gaze X'] = rng.uniform(0, 800, fixation.max() + 1)[fixation] + rng.normal(0, 2, samples)
+        d['Gaze Y'] = rng.uniform(0, 450, fixation.max() + 1)[fixation] + rng.normal(0, 2, samples)
+        d.loc[rng.random(samples) < .05, ['Gaze X', 'Gaze Y']] = np.nan
+        direction = np.column_stack([(d['Gaze X'] - 400) / 800, (d['Gaze Y'] - 225) / 800, np.ones(samples)])
+        for i, c in enumerate(['ET_Gaze3DX', 'ET_Gaze3DY', 'ET_Gaze3DZ']):
+            d[c] = direction[:, i]
+        for c in ['ET_GyroX', 'ET_GyroY', 'ET_GyroZ', 'ET_AccX', 'ET_AccY', 'ET_AccZ']:
+            d[c] = rng.normal(size=samples)
+        d['ET_PupilLeft'] = rng.normal(4, .5, samples)
+        d['ET_PupilRight'] = rng.normal(4, .5, samples)
+        d['ET_DistanceLeft'] = rng.normal(600, 300, samples)
+        d['ET_ValidityLeftEye'] = rng.integers(0, 5, samples)
+        d['Blink detected (binary)'] = (rng.random(samples) < .05).astype(int)
+
+        # Events as iMotions exports them: every sample of an event repeats its stats
+        is_fix = (fixation % 2) == 0
+        d['Fixation Index'] = np.where(is_fix, fixation, np.nan)
+        d['Fixation X'] = np.where(is_fix, fixation * 3 % 800, np.nan)
+        d['Fixation Y'] = np.where(is_fix, fixation * 7 % 450, np.nan)
+        d['Fixation Duration'] = np.where(is_fix, 200 + fixation, np.nan)
+        d['Fixation Dispersion'] = np.where(is_fix, .5 + fixation / 100, np.nan)
+        d['Saccade Index'] = np.where(~is_fix, fixation, np.nan)
+        d['Saccade Duration'] = np.where(~is_fix, 40 + fixation, np.nan)
+        d['Saccade Amplitude'] = np.where(~is_fix, 2 + fixation / 10, np.nan)
+
+        gsr = np.cumsum(rng.normal(0, .01, samples)) + 5
+        d['GSR Raw (microSiemens)'] = gsr
+        d['Tonic signal (microSiemens)'] = gsr - .1
+        d['Phasic signal (microSiemens)'] = .1
+        peak = (rng.random(samples) < .01).astype(int)
+        d['Peak detected (binary)'] = peak
+        d['Peak amplitude (microSiemens)'] = np.where(peak == 1, .2, np.nan)
+
+        # 5 viewpoints after each other
+        visit = samples // 5
+        relative = np.zeros(samples)
+        for v in range(5):
+            active = np.zeros(samples, dtype=int)
+            active[v * visit + 10:(v + 1) * visit - 10] = 1
+            d[f'Viewpoint_{v + 1} active on Tobii Glasses 2 Scene'] = active
+            relative[v * visit:(v + 1) * visit] = (t[v * visit:(v + 1) * visit] - t[v * visit]) / 1000
+        d['Relative timestamp (s)'] = relative
+        frames.append(d)
+    return pd.concat(frames, ignore_index=True).sample(frac=1, random_state=seed)
+
+
+# Writes the export where config.py expects it (./data/Data_all_respondents.csv, relative to directory)
+def write_export(directory, df):
+    os.makedirs(os.path.join(directory, 'data'), exist_ok=True)
+    df.to_csv(os.path.join(directory, 'data', 'Data_all_respondents.csv'))
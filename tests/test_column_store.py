@@ -0,0 +1,53 @@
+import mmap
+
+import numpy as np
+import pandas as pd
+
+from datastore.column_store import write_columns, read_columns, with_columns
+
+
+# Whether the array is (a view of) a memory-mapped file
+def is_mapped(values):
+    while values is not None:
+        if isinstance(values, (np.memmap, mmap.mmap)):
+            return True
+        values = getattr(values, 'base', None)
+    return False
+
+
+def column_frame(n=10000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'Resp name': pd.Categorical(np.repeat(['a', 'b'], n // 2)),
+                         'Timestamp (s)': np.arange(n) / 128,
+                         'Gaze X': rng.normal(size=n),
+                         'Gaze Y': rng.normal(size=n),
+                         'Blink detected (binary)': rng.integers(0, 2, n).astype(np.int8),
+                         'Resp rec datetime': pd.Timestamp('2021-05-20 10:00') + pd.to_timedelta(np.arange(n), 's')})
+
+
+def test_round_trip(tmp_path):
+    df = column_frame()
+    write_columns(df, str(tmp_path / 'store'))
+    pd.testing.assert_frame_equal(read_columns(str(tmp_path / 'store')).copy(), df)
+
+
+def test_columns_stay_mapped_after_filtering(tmp_path):
+    write_columns(column_frame(), str(tmp_path / 'store'))
+    df = read_columns(str(tmp_path / 'store'))
+    numeric = ['Timestamp (s)', 'Gaze X', 'Gaze Y', 'Blink detected (binary)']
+    assert all(is_mapped(df[col].to_numpy()) for col in numeric)
+
+    # filters (masks, takes, groupby) must not copy the mapped columns into memory
+    mask = df['Gaze X'].to_numpy() > 0
+    assert len(df[mask]) == mask.sum()
+    df.take(np.arange(0, len(df), 3))
+    df.groupby('Resp name', observed=True)['Gaze Y'].mean()
+    assert all(is_mapped(df[col].to_numpy()) for col in numeric)
+    assert is_mapped(df['Resp name'].cat.codes.to_numpy())
+
+    # a row range stays a view of the mapped columns
+    assert is_mapped(df.iloc[100:200]['Gaze X'].to_numpy())
+
+    # replacing columns keeps the others mapped
+    replaced = with_columns(df, {'Gaze X': np.zeros(len(df))})
+    assert is_mapped(replaced['Gaze Y'].to_numpy()) and not is_mapped(replaced['Gaze X'].to_numpy())
@@ -0,0 +1,34 @@
+import sys
+import importlib
+
+import pytest
+
+import config
+from tests.synthetic import export_frame, write_export, EVENT_COLS
+
+
+# Imports datastore/dataset.py (which loads the data at import) in a directory with a synthetic export
+@pytest.fixture
+def load_dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def load(df, **settings):
+        write_export(tmp_path, df)
+        for name, value in settings.items():
+            monkeypatch.setattr(config, name, value)
+        sys.modules.pop('datastore.dataset', None)
+        return importlib.import_module('datastore.dataset')
+
+    yield load
+    sys.modules.pop('datastore.dataset', None)
+
+
+def test_computed_events_without_imported_columns(load_dataset):
+    dataset = load_dataset(export_frame().drop(columns=EVENT_COLS), EVENTS_SOURCE='computed')
+
+    assert set(EVENT_COLS) <= set(dataset.df.columns)
+    assert len(dataset.fixations) > 0 and len(dataset.saccades) > 0
+    fixation_samples = dataset.df.dropna(subset=['Fixation Index'])
+    assert len(dataset.fixations) == len(fixation_samples.groupby(['Resp name', 'Fixation Index'], observed=True))
+    assert dataset.fixations['Fixation Duration'].min() >= config.MIN_FIXATION_DURATION * 1000
+    assert dataset.cube['fixations'].sum() == (dataset.fixations['Viewpoint'] > 0).sum()
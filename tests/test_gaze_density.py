@@ -0,0 +1,23 @@
+import numpy as np
+
+from datastore.gaze_density import density_grid, smooth
+
+
+def test_smooth_keeps_the_shape_with_a_kernel_longer_than_the_grid():
+    grid = np.zeros((3, 40))
+    grid[1, 20] = 1
+    smoothed = smooth(grid, sigma=5)    # kernel of 31 cells, the grid has 3 rows
+    assert smoothed.shape == grid.shape
+    assert np.isclose(smoothed.sum(), 1)
+
+    single = smooth(np.ones((1, 1)), sigma=5)
+    assert single.shape == (1, 1)
+
+
+def test_density_grid_over_the_extent():
+    x = np.array([5, 15, 15, np.nan])
+    y = np.array([5, 5, 15, 2])
+    grid, xs, ys = density_grid(x, y, (0, 20, 0, 20), (2, 2))
+    assert grid.shape == (2, 2)
+    assert list(xs) == [5, 15] and list(ys) == [5, 15]
+    assert grid.tolist() == [[1, 1], [0, 1]]
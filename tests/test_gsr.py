@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from datastore import gsr
+from datastore.gsr import process_gsr, GSR_COLS
+from tests.synthetic import export_frame
+
+
+def gsr_frame(samples=5000):
+    df = export_frame(respondents=3, samples=samples)[['Resp name', 'Timestamp (s)', 'GSR Raw (microSiemens)']]
+    df['Resp name'] = df['Resp name'].astype('category')
+    # responses (and peaks) on top of the drift, some missing samples
+    t = df['Timestamp (s)'].to_numpy()
+    df['GSR Raw (microSiemens)'] += .3 * np.clip(np.sin(t / 3), 0, None) ** 4
+    df.loc[df.sample(frac=.01, random_state=2).index, 'GSR Raw (microSiemens)'] = np.nan
+    return df.reset_index(drop=True)
+
+
+def by_sample(df, out):
+    # signals keyed on (respondent, time), so frames with other rows can be compared
+    out = pd.concat([df[['Resp name', 'Timestamp (s)']], out], axis=1)
+    return out.set_index(['Resp name', 'Timestamp (s)']).sort_index()
+
+
+def test_appended_samples_match_a_full_recompute(tmp_path, monkeypatch):
+    df = gsr_frame()
+    state_path = str(tmp_path / 'gsr-state.pkl')
+    first = df[df['Timestamp (s)'] < 60 + 10 * df['Resp name'].cat.codes].reset_index(drop=True)
+    process_gsr(first, chunk=700, state_path=state_path)
+
+    # only the appended samples are pushed
+    pushed = []
+    push = gsr.GsrStream.push
+    monkeypatch.setattr(gsr.GsrStream, 'push', lambda self, t, raw: pushed.append(len(t)) or push(self, t, raw))
+    incremental = process_gsr(df, chunk=700, state_path=state_path)
+    assert sum(pushed) == len(df) - len(first)
+    monkeypatch.undo()
+
+    full = process_gsr(df, chunk=700)
+    incremental, full = by_sample(df, incremental), by_sample(df, full)
+    assert (incremental['Peak detected (binary)'] == full['Peak detected (binary)']).all()
+    assert full['Peak detected (binary)'].sum() > 0
+    for col in GSR_COLS:
+        assert np.allclose(incremental[col], full[col], equal_nan=True, atol=1e-6), col
+
+
+def test_changed_samples_start_over(tmp_path):
+    df = gsr_frame(2000)
+    state_path = str(tmp_path / 'gsr-state.pkl')
+    process_gsr(df, state_path=state_path)
+
+    changed = df.copy()
+    changed.loc[changed['Timestamp (s)'] < 5, 'GSR Raw (microSiemens)'] += 1
+    assert np.allclose(process_gsr(changed, state_path=state_path), process_gsr(changed), equal_nan=True)
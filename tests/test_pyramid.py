@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from datastore.pyramid import TimeSeriesPyramids
+
+
+def signal_frame(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'Resp name': np.repeat(['a', 'b'], n // 2),
+                         'Timestamp (s)': np.tile(np.arange(n // 2) / 128, 2),
+                         'GSR Raw (microSiemens)': rng.normal(size=n).cumsum()})
+
+
+def brute_force(values, rows, factor):
+    # Rows of the min and the max of every bucket of `factor` kept samples
+    picked = set()
+    for b in range(0, len(rows), factor):
+        bucket = rows[b:b + factor]
+        picked.add(bucket[np.argmin(values[bucket])])
+        picked.add(bucket[np.argmax(values[bucket])])
+    return picked
+
+
+def test_scattered_keep_matches_brute_force_min_max():
+    df = signal_frame()
+    pyramids = TimeSeriesPyramids(df, 'Timestamp (s)', ['GSR Raw (microSiemens)'])
+    values = df['GSR Raw (microSiemens)'].to_numpy()
+    keep = np.random.default_rng(1).random(len(df)) < .3
+    budget = 200
+
+    for x_range in [None, (5, 60), (12.3, 12.9)]:
+        rows = pyramids.query('a', 'GSR Raw (microSiemens)', x_range, budget, keep)
+
+        times = df['Timestamp (s)'].to_numpy()
+        kept = np.flatnonzero(keep & (df['Resp name'] == 'a').to_numpy())
+        if x_range is not None:
+            kept = kept[(times[kept] >= x_range[0]) & (times[kept] <= x_range[1])]
+
+        assert keep[rows].all()
+        assert values[rows].min() == values[kept].min()
+        assert values[rows].max() == values[kept].max()
+        if len(kept) <= budget:
+            assert set(rows) == set(kept)
+        else:
+            assert set(rows) == brute_force(values, kept, -(-2 * len(kept) // budget))
+            assert len(rows) <= budget
+
+
+def test_contiguous_keep_uses_the_window():
+    df = signal_frame()
+    pyramids = TimeSeriesPyramids(df, 'Timestamp (s)', ['GSR Raw (microSiemens)'])
+    values = df['GSR Raw (microSiemens)'].to_numpy()
+    keep = np.zeros(len(df), dtype=bool)
+    keep[2000:6000] = True
+
+    rows = pyramids.query('a', 'GSR Raw (microSiemens)', budget=200, keep=keep)
+    assert keep[rows].all()
+    assert values[rows].min() == values[2000:6000].min()
+    assert values[rows].max() == values[2000:6000].max()
@@ -0,0 +1,21 @@
+"""
+Production entry point: gunicorn -c gunicorn.conf.py wsgi:server
+('python index.py' runs the single process development server)
+"""
+import gc
+
+from index import app
+
+# Importing index loads the dataset (datastore/dataset.py). gunicorn imports this module
+# before it forks the workers (preload_app in gunicorn.conf.py), so the workers share it instead
+# of each loading their own copy:
+# - the memory-mapped columns of DATA_STORE = 'columns' through the OS page cache (they stay
+#   mapped when the df is filtered with pandas >= 2, see datastore/column_store.py)
+# - the tables and indexes built from them (events, cube, bitmaps, pyramids...) copy-on-write
+# Per process: the memory tiers of the filter and figure caches (FILTER_CACHE_MB, FIGURE_CACHE_MB),
+# the disk tier of the figure cache is shared.
+server = app.server
+
+# Move the loaded objects out of the garbage collector's generations: a collection in a worker
+# would otherwise write to (and so copy) every page that holds one of their headers
+gc.freeze()